@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+
+# Measure startup cost: the import time of each pytregex module, the cost of
+# building a head finder, and the wall time of short CLI runs, all in fresh
+# interpreters.
+#
+#   python benchmarks/bench_startup.py [n_runs]
+#
+# Run it with and without PYTHONDONTWRITEBYTECODE=1 to see the cost with cold
+# and warm bytecode caches.
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+from collections import defaultdict
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+sys.path.insert(0, SRC)
+ENV = dict(os.environ, PYTHONPATH=SRC)
+
+TREE = "(ROOT (S (NP (DT The) (NN battery) (NN plant)) (VP (VBD closed)) (. .)))"
+CLI_RUNS = {
+    "pattern": ["pattern", "NP < NN", "-filter", "-C"],
+    "explain": ["explain", "<<"],
+    "pprint": ["pprint", TREE],
+    "--version": ["--version"],
+}
+
+
+def import_times(statement: str) -> dict[str, tuple[int, int]]:
+    """Self and cumulative import time, in us, of each module imported by `statement`."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        env=ENV,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    ret = {}
+    # import time: self [us] | cumulative | imported package
+    for line in proc.stderr.splitlines():
+        self_us, cumulative, name = line.split("|")
+        if (name := name.strip()) != "imported package":
+            ret[name] = (int(self_us.rsplit(":", 1)[1]), int(cumulative))
+    return ret
+
+
+def cli_time(args: list[str]) -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-m", "pytregex", *args],
+        env=ENV,
+        input=TREE,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    n_runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    for statement in ("import pytregex", "import pytregex.tregex"):
+        samples: defaultdict[str, list[tuple[int, int]]] = defaultdict(list)
+        for _ in range(n_runs):
+            for name, times in import_times(statement).items():
+                samples[name].append(times)
+        print(f"{statement!r}, median of {n_runs} runs")
+        print(f"  {'module':<42} {'self ms':>8} {'cumul ms':>9}")
+        for name, times in sorted(samples.items(), key=lambda item: -statistics.median(t[1] for t in item[1])):
+            self_ms = statistics.median(t[0] for t in times) / 1000
+            cumulative_ms = statistics.median(t[1] for t in times) / 1000
+            # all of our modules, and the expensive ones of the standard library
+            if name.startswith("pytregex") or cumulative_ms >= 1:
+                print(f"  {name:<42} {self_ms:>8.2f} {cumulative_ms:>9.2f}")
+        print()
+
+    from pytregex.collins_head_finder import CollinsHeadFinder  # noqa: E402
+
+    n = 50
+    per_finder = timeit.timeit(CollinsHeadFinder, number=n) / n
+    print(f"CollinsHeadFinder() {per_finder * 1000:.2f} ms\n")
+
+    print(f"CLI wall time, one tree, median of {n_runs} runs")
+    baseline = statistics.median(
+        timeit.repeat(
+            lambda: subprocess.run([sys.executable, "-c", "pass"], env=ENV, check=True), number=1, repeat=n_runs
+        )
+    )
+    print(f"  {'python -c pass':<18} {baseline * 1000:>7.1f} ms")
+    for name, args in CLI_RUNS.items():
+        median = statistics.median(cli_time(args) for _ in range(n_runs))
+        print(f"  {name:<18} {median * 1000:>7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
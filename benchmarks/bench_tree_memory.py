@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+
+# Measure the memory taken by parsed trees, in bytes per node.
+#
+#   python benchmarks/bench_tree_memory.py [n_trees]
+#
+# "dict" is a Tree subclass that gets a per-instance __dict__ back, i.e. the
+# layout Tree had before it was given __slots__.
+
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from pytregex.tree import LabelTable, Tree  # noqa: E402
+
+TREE = (
+    "(ROOT (S (NP (EX There)) (VP (VBD was) (NP (NP (DT no) (NN possibility)) (PP (IN of) (S (VP (VBG taking)"
+    " (NP (DT a) (NN walk)) (NP (DT that) (NN day))))))) (. .)))"
+)
+
+
+class DictTree(Tree):
+    pass
+
+
+def measure(cls: type[Tree], tree_string: str, labels: bool) -> tuple[int, int]:
+    tracemalloc.start()
+    trees = list(cls.fromstring(tree_string, labels=LabelTable() if labels else None))
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    n_nodes = sum(1 for tree in trees for _ in tree.preorder_iter())
+    return size, n_nodes
+
+
+def main() -> None:
+    n_trees = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    tree_string = "\n".join([TREE] * n_trees)
+    print(f"{'layout':<8} {'labels':<9} {'nodes':>8} {'bytes/node':>11}")
+    for name, cls in (("dict", DictTree), ("slots", Tree)):
+        for labels in (False, True):
+            size, n_nodes = measure(cls, tree_string, labels)
+            print(f"{name:<8} {'interned' if labels else 'plain':<9} {n_nodes:>8} {size / n_nodes:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
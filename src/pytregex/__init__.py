@@ -3,7 +3,27 @@
 from .about import __version__
 from .main import main
 
+# typing.TYPE_CHECKING without importing typing, which costs more at startup
+# than explain or pprint need in total
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from .tregex import TregexPattern, compile, pattern_cache, purge
+
 __all__ = [
     "main",
     "__version__",
+    "TregexPattern",
+    "compile",
+    "pattern_cache",
+    "purge",
 ]
+
+
+def __getattr__(name: str):
+    # the matcher pulls in the pattern grammar and PLY, import it only once it
+    # is asked for so that `pytregex explain` and `pytregex pprint` start fast
+    if name in ("TregexPattern", "compile", "pattern_cache", "purge"):
+        from . import tregex
+
+        return getattr(tregex, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,3 +1,4 @@
+from collections.abc import Callable
 from typing import TYPE_CHECKING, Optional
 
 from .head_finder import HeadFinder
@@ -9,6 +10,81 @@ if TYPE_CHECKING:
     from .tree import Tree
 
 
+class HeadRule:
+    """
+    A head rule such as ["left", "NN", "NP"], compiled so that finding the
+    head among the daughters takes a single pass over them. The first element
+    names the search:
+
+        left/right              the daughters are searched for the first
+                                category of the rule, then the second, ...
+        leftdis/rightdis        the first daughter of any of the categories
+        leftexcept/rightexcept  the first daughter of none of the categories
+
+    from the left or the right.
+    """
+
+    __slots__ = ("how", "from_left", "categories", "priority", "find")
+
+    def __init__(self, how: list[str]) -> None:
+        direction = how[0]
+        self.how = how
+        self.from_left = direction.startswith("left")
+        self.categories = frozenset(how[1:])
+        # lower is preferred, for left/right
+        self.priority: dict[str, int] = {}
+        for cat in how[1:]:
+            self.priority.setdefault(cat, len(self.priority))
+
+        finders = {
+            "left": self._find_by_priority,
+            "leftdis": self._find_any,
+            "leftexcept": self._find_except,
+            "right": self._find_by_priority,
+            "rightdis": self._find_any,
+            "rightexcept": self._find_except,
+        }
+        try:
+            self.find: Callable[[list[Tree]], int] = finders[direction]
+        except KeyError as e:
+            raise ValueError("Invalid direction type") from e
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.how!r})"
+
+    def _indices(self, daughterTrees: list["Tree"]) -> range:
+        if self.from_left:
+            return range(len(daughterTrees))
+        return range(len(daughterTrees) - 1, -1, -1)
+
+    def _find_by_priority(self, daughterTrees: list["Tree"]) -> int:
+        priority = self.priority
+        headIdx = -1
+        best = len(priority)
+        for i in self._indices(daughterTrees):
+            rank = priority.get(daughterTrees[i].label, best)  # type:ignore
+            # ties go to the daughter seen first
+            if rank < best:
+                headIdx, best = i, rank
+                if rank == 0:
+                    break
+        return headIdx
+
+    def _find_any(self, daughterTrees: list["Tree"]) -> int:
+        categories = self.categories
+        for i in self._indices(daughterTrees):
+            if daughterTrees[i].label in categories:
+                return i
+        return -1
+
+    def _find_except(self, daughterTrees: list["Tree"]) -> int:
+        categories = self.categories
+        for i in self._indices(daughterTrees):
+            if daughterTrees[i].label not in categories:
+                return i
+        return -1
+
+
 class AbstractCollinsHeadFinder(HeadFinder):
     def __init__(self, *categoriesToAvoid) -> None:
         self.nonTerminalInfo: Optional[dict] = None
@@ -23,14 +99,21 @@ class AbstractCollinsHeadFinder(HeadFinder):
             self.defaultLeftRule = ["left"]
             self.defaultRightRule = ["right"]
 
-        self._how_map = {
-            "left": self.findLeftHead,
-            "leftdis": self.findLeftDisHead,
-            "leftexcept": self.findLeftExceptHead,
-            "right": self.findRightHead,
-            "rightdis": self.findRightDisHead,
-            "rightexcept": self.findRightExceptHead,
-        }
+        # nonTerminalInfo compiled by compile_rules()
+        self._rules: Optional[dict[str, list[HeadRule]]] = None
+
+    def compile_rules(self) -> None:
+        """
+        Compile nonTerminalInfo and the default rules into HeadRule objects.
+        Subclasses call this once they have filled nonTerminalInfo.
+        """
+        if self.nonTerminalInfo is None:
+            raise ValueError(
+                "Classes derived from AbstractCollinsHeadFinder must create and fill HashMap nonTerminalInfo."
+            )
+        self._rules = {cat: [HeadRule(how) for how in hows] for cat, hows in self.nonTerminalInfo.items()}
+        self._default_left_rule = HeadRule(self.defaultLeftRule)
+        self._default_right_rule = HeadRule(self.defaultRightRule)
 
     def findMarkedHead(self, t: "Tree"):
         return None
@@ -78,50 +161,43 @@ class AbstractCollinsHeadFinder(HeadFinder):
         motherCat = t.label
         if motherCat.startswith("@"):
             motherCat = motherCat[1:]
-        if self.nonTerminalInfo is not None and motherCat not in self.nonTerminalInfo:
+        if self._rules is None:
+            self.compile_rules()
+        if motherCat not in self._rules:  # type:ignore
             return None
 
-        hows: list[list[str]] = self.nonTerminalInfo.get(motherCat, None)  # type:ignore
+        rules = self._rules[motherCat]  # type:ignore
         kids = t.children
-        if hows is None:
-            if self.defaultRule is not None:
-                return self.traverseLocate(kids, self.defaultRule, True)
-            else:
-                raise ValueError(f"No head rule defined for {motherCat}")
-
-        for i in range(len(hows)):
-            lastResort = i == (len(hows) - 1)
-            theHead = self.traverseLocate(kids, hows[i], lastResort)
+        for i, rule in enumerate(rules):
+            lastResort = i == (len(rules) - 1)
+            theHead = self.traverseLocate(kids, rule, lastResort)
             if theHead is not None:
                 break
         return theHead
 
-    def traverseLocate(self, daughterTrees: list["Tree"], how: list[str], lastResort: bool) -> Optional["Tree"]:
+    def traverseLocate(self, daughterTrees: list["Tree"], rule: HeadRule, lastResort: bool) -> Optional["Tree"]:
         """
         Attempt to locate head daughter tree from among daughters. Go through
         daughterTrees looking for things from or not in a set given by the
-        contents of the list how, and if you do not find one, take leftmost or
+        categories of the rule, and if you do not find one, take leftmost or
         rightmost perhaps matching thing if lastResort is true, otherwise
         return None.
         """
-        try:
-            headIdx = self._how_map[how[0]](daughterTrees, how)
-        except KeyError as e:
-            raise ValueError("Invalid direction type") from e
+        headIdx = rule.find(daughterTrees)
         if headIdx < 0:
             if lastResort:
                 # use the default rule to try to match anything except
                 # categoriesToAvoid if that doesn't match, we'll return the
                 # left or rightmost child (by setting headIdx).  We want to be
                 # careful to ensure that postOperationFix runs exactly once.
-                if how[0].startswith("left"):
+                if rule.from_left:
                     headIdx = 0
-                    rule = self.defaultLeftRule
+                    default_rule = self._default_left_rule
                 else:
                     headIdx = len(daughterTrees) - 1
-                    rule = self.defaultRightRule
+                    default_rule = self._default_right_rule
 
-                child = self.traverseLocate(daughterTrees, rule, False)
+                child = self.traverseLocate(daughterTrees, default_rule, False)
                 if child is not None:
                     return child
                 else:
@@ -132,61 +208,5 @@ class AbstractCollinsHeadFinder(HeadFinder):
         headIdx = self.postOperationFix(headIdx, daughterTrees)
         return daughterTrees[headIdx]
 
-    def findLeftHead(self, daughterTrees: list["Tree"], how: list[str]):  # {{{
-        for i in range(1, len(how)):
-            for headIdx in range(len(daughterTrees)):
-                childCat = daughterTrees[headIdx].label
-                if how[i] == childCat:
-                    return headIdx
-        return -1
-
-    def findLeftDisHead(self, daughterTrees: list["Tree"], how: list[str]):
-        for headIdx in range(len(daughterTrees)):
-            childCat = daughterTrees[headIdx].label
-            for i in range(1, len(how)):
-                if how[i] == childCat:
-                    return headIdx
-        return -1
-
-    def findLeftExceptHead(self, daughterTrees: list["Tree"], how: list[str]):
-        for headIdx in range(len(daughterTrees)):
-            childCat = daughterTrees[headIdx].label
-            found = True
-            for i in range(1, len(how)):
-                if how[i] == childCat:
-                    found = False
-            if found:
-                return headIdx
-        return -1
-
-    def findRightHead(self, daughterTrees: list["Tree"], how: list[str]):
-        for i in range(1, len(how)):
-            for headIdx in range(len(daughterTrees) - 1, -1, -1):
-                childCat = daughterTrees[headIdx].label
-                if how[i] == childCat:
-                    return headIdx
-        return -1
-
-    # from right, but search for any of the categories, not by category in turn
-    def findRightDisHead(self, daughterTrees: list["Tree"], how: list[str]):
-        for headIdx in range(len(daughterTrees) - 1, -1, -1):
-            childCat = daughterTrees[headIdx].label
-            for i in range(1, len(how)):
-                if how[i] == childCat:
-                    return headIdx
-        return -1
-
-    def findRightExceptHead(self, daughterTrees: list["Tree"], how: list[str]):
-        for headIdx in range(len(daughterTrees) - 1, -1, -1):
-            childCat = daughterTrees[headIdx].label
-            found = True
-            for i in range(1, len(how)):
-                if how[i] == childCat:
-                    found = False
-            if found:
-                return headIdx
-        return -1
-
-    # }}}
     def postOperationFix(self, headIdx: int, daughterTrees: list["Tree"]) -> int:
         return headIdx
@@ -161,6 +161,7 @@ class CollinsHeadFinder(AbstractCollinsHeadFinder):
             "EDITED": [["left"]],  # crap rule for Switchboard (if don't delete EDITED nodes)
             "XS": [["right", "IN"]],  # rule for new structure in QP
         }  # }}}
+        self.compile_rules()
 
     def postOperationFix(self, headIdx: int, daughterTrees: list["Tree"]) -> int:
         if headIdx >= 2:
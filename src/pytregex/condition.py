@@ -1,14 +1,17 @@
 #!/usr/bin/env python3
 
 import re
+import sys
 from abc import ABC, abstractmethod
-from collections.abc import Generator, Iterable, Iterator
-from copy import deepcopy
-from typing import TYPE_CHECKING, NamedTuple, Optional, Union
+from collections.abc import Callable, Generator, Iterable, Iterator
+from functools import lru_cache
+from operator import attrgetter
+from typing import TYPE_CHECKING, NamedTuple, Optional
 
 from .exceptions import ParseException
 
 if TYPE_CHECKING:
+    from .head_finder import HeadFinder
     from .relation import AbstractRelationData
     from .tree import Tree
 
@@ -36,16 +39,58 @@ class NodeDescription(NamedTuple):
         return self.value
 
 
+_UNBOUND = object()
+
+
+class Bindings:
+    """
+    Name->node environment threaded through the search. Every bind() is
+    recorded on a trail together with the value it shadows, so taking a
+    snapshot is just remembering the trail length, and rolling back undoes
+    only the binds made since. It also carries the head finder of the search,
+    None for the default one.
+    """
+
+    def __init__(self, head_finder: Optional["HeadFinder"] = None) -> None:
+        self._nodes: dict[str, Tree] = {}
+        self._trail: list[tuple[str, object]] = []
+        self.head_finder = head_finder
+
+    def __repr__(self) -> str:
+        return repr(self._nodes)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._nodes
+
+    def __getitem__(self, name: str) -> "Tree":
+        return self._nodes[name]
+
+    def get(self, name: str) -> Optional["Tree"]:
+        return self._nodes.get(name)
+
+    def bind(self, name: str, node: "Tree") -> None:
+        self._trail.append((name, self._nodes.get(name, _UNBOUND)))
+        self._nodes[name] = node
+
+    def mark(self) -> int:
+        return len(self._trail)
+
+    def undo(self, mark: int) -> None:
+        trail, nodes = self._trail, self._nodes
+        while len(trail) > mark:
+            name, old = trail.pop()
+            if old is _UNBOUND:
+                del nodes[name]
+            else:
+                nodes[name] = old  # type:ignore
+
+    def to_dict(self) -> dict[str, "Tree"]:
+        return self._nodes.copy()
+
+
 class BackRef:
-    def __init__(self, node_descriptions: "NodeDescriptions", nodes: Optional[list["Tree"]]) -> None:
+    def __init__(self, node_descriptions: "NodeDescriptions") -> None:
         self.node_descriptions = node_descriptions
-        self.nodes = nodes
-
-    def store_nodes(self, nodes: list["Tree"]) -> None:
-        if self.nodes is not None:
-            self.nodes.extend(nodes)
-        else:
-            self.nodes = nodes
 
 
 class NodeDescriptions:
@@ -64,6 +109,9 @@ class NodeDescriptions:
         self.condition = condition
         self.name = name
 
+        self._satisfies_ignore_condition: Callable[[Tree], bool]
+        self._compile()
+
     def __iter__(self) -> Iterator[NodeDescription]:
         return iter(self.descriptions)
 
@@ -116,12 +164,14 @@ class NodeDescriptions:
 
     def add_description(self, other_description: NodeDescription) -> None:
         self.descriptions.append(other_description)
+        self._compile()
 
     def negate(self) -> bool:
         if self.under_negation:
             return False
 
         self.under_negation = True
+        self._compile()
         return True
 
     def enable_basic_cat(self) -> bool:
@@ -129,17 +179,59 @@ class NodeDescriptions:
             return False
 
         self.use_basic_cat = True
+        self._compile()
         return True
 
-    def _satisfies_ignore_condition(self, t: "Tree"):
-        return any(
-            desc.op.satisfies(
-                t, desc.value, under_negation=self.under_negation, use_basic_cat=self.use_basic_cat
-            )
-            for desc in self.descriptions
-        )
+    def _compile(self) -> None:
+        """
+        Compile the descriptions into one predicate, self._satisfies_ignore_condition,
+        which is equivalent to any(desc.op.satisfies(t, desc.value, ...) for desc in self.descriptions):
+        IDs become a frozenset lookup and regexes are compiled once, merged into
+        a single alternation where possible.
+        """
+        # interned, so that they are identical to labels interned by a LabelTable
+        ids = frozenset(sys.intern(desc.value) for desc in self.descriptions if desc.op is NODE_ID)
+        regexes = [NODE_REGEX.compile(desc.value) for desc in self.descriptions if desc.op is NODE_REGEX]
+        has_any = any(desc.op is NODE_ANY for desc in self.descriptions)
+        has_root = any(desc.op is NODE_ROOT for desc in self.descriptions)
+        get_value = attrgetter("basic_category" if self.use_basic_cat else "label")
+
+        predicate: Callable[[Tree], bool]
+        if not self.under_negation:
+            if has_any:
+                predicate = _always_true
+            else:
+                searches = [regex.search for regex in NODE_REGEX.merge(regexes)]
+
+                def predicate(t: "Tree") -> bool:
+                    if has_root and t.parent is None:
+                        return True
+                    value = get_value(t)
+                    if value is None:
+                        return False
+                    return value in ids or any(search(value) is not None for search in searches)
 
-    # def satisfies(self, t: "Tree", backref_table: dict[str, BackRef]) -> bool:
+        else:
+            # each description is negated on its own, so a node is rejected only
+            # if it matches every one of them, which never happens for two
+            # distinct IDs
+            searches = [regex.search for regex in regexes]
+            has_value_descs = bool(ids or searches)
+            ids_always_fail = len(ids) > 1
+
+            def predicate(t: "Tree") -> bool:
+                if has_root and t.parent is not None:
+                    return True
+                if not has_value_descs:
+                    return False
+                value = get_value(t)
+                if value is None or ids_always_fail:
+                    return True
+                return (bool(ids) and value not in ids) or any(search(value) is None for search in searches)
+
+        self._satisfies_ignore_condition = predicate
+
+    # def satisfies(self, t: "Tree", bindings: Bindings) -> bool:
     #     if self.condition is None:
     #         return any(
     #             desc.op.satisfies(
@@ -153,27 +245,34 @@ class NodeDescriptions:
     #             desc.op.satisfies(
     #                 t, desc.value, under_negation=self.under_negation, use_basic_cat=self.use_basic_cat
     #             )
-    #             and cond_satisfies(t, backref_table)
+    #             and cond_satisfies(t, bindings)
     #             for desc in self.descriptions
     #         )
 
     def searchNodeIterator(
-        self, t: "Tree", backref_table: dict[str, BackRef], *, recursive: bool = True
+        self, t: "Tree", bindings: Bindings, *, recursive: bool = True
     ) -> Generator["Tree", None, None]:
-        node_gen: Generator[Tree, None, None] = t.preorder_iter() if recursive else (t for _ in range(1))
-        node_gen = (n for n in node_gen if self._satisfies_ignore_condition(n))
-
-        ret: Union[Generator[Tree, None, None], list[Tree]]
-        if self.condition is None:
-            ret = node_gen
-        else:
-            cond_search = self.condition.searchNodeIterator
-            ret = (m for node in node_gen for m in cond_search(node, backref_table))
-
-        if self.name is not None:
-            ret = list(ret)
-            backref_table[self.name].store_nodes(ret)
-        yield from ret
+        node_gen: Iterable[Tree] = t.preorder_iter() if recursive else (t,)
+        name = self.name
+
+        for node in node_gen:
+            if not self._satisfies_ignore_condition(node):
+                continue
+            matches: Iterable[Tree] = (
+                (node,) if self.condition is None else self.condition.searchNodeIterator(node, bindings)
+            )
+            if name is None:
+                yield from matches
+                continue
+            for m in matches:
+                # the name is bound only while the match is handed out, so that
+                # the bindings seen by the consumer belong to that very match
+                mark = bindings.mark()
+                bindings.bind(name, node)
+                try:
+                    yield m
+                finally:
+                    bindings.undo(mark)
 
 
 class NODE_OP(ABC):
@@ -228,28 +327,55 @@ class NODE_REGEX(NODE_OP):
         if value is None:
             return under_negation
         else:
-            # Convert regex to standard python regex
-            flag = ""
+            return (cls.compile(regex).search(value) is not None) != under_negation
+
+    @classmethod
+    @lru_cache(maxsize=1024)
+    def compile(cls, regex: str) -> re.Pattern:
+        """Convert "/regex/flags" to a compiled standard python regex"""
+        flags = 0
+        current_flag = regex[-1]
+        while current_flag != "/":
+            # Seems that only (?m) and (?x) are useful for node describing:
+            #  re.ASCII      (?a)
+            #  re.IGNORECASE (?i)
+            #  re.LOCALE     (?L)
+            #  re.DOTALL     (?s)
+            #  re.MULTILINE  (?m)
+            #  re.VERBOSE    (?x)
+            if current_flag == "i":
+                flags |= re.IGNORECASE
+            elif current_flag == "x":
+                flags |= re.VERBOSE
+            else:
+                raise ValueError(f"Error!! Unsupported regexp flag: {current_flag}")
+            regex = regex[:-1]
             current_flag = regex[-1]
-            while current_flag != "/":
-                # Seems that only (?m) and (?x) are useful for node describing:
-                #  re.ASCII      (?a)
-                #  re.IGNORECASE (?i)
-                #  re.LOCALE     (?L)
-                #  re.DOTALL     (?s)
-                #  re.MULTILINE  (?m)
-                #  re.VERBOSE    (?x)
-                if current_flag not in "xi":
-                    raise ValueError(f"Error!! Unsupported regexp flag: {current_flag}")
-                flag += current_flag
-                regex = regex[:-1]
-                current_flag = regex[-1]
-
-            regex = regex[1:-1]
-            if flag:
-                regex = "(?" + "".join(set(flag)) + ")" + regex
-
-            return (re.search(regex, value) is not None) != under_negation
+
+        return re.compile(regex[1:-1], flags)
+
+    @classmethod
+    def merge(cls, regexes: list[re.Pattern]) -> list[re.Pattern]:
+        """
+        Merge regexes into one alternation. Regexes with groups (whose
+        backreferences would be renumbered), with the verbose flag (whose
+        comments could swallow the closing parenthesis) or starting with "(?"
+        (whose inline global flags must stay at the start) are kept apart.
+        """
+        mergeable = [
+            regex
+            for regex in regexes
+            if regex.groups == 0 and not regex.flags & re.VERBOSE and not regex.pattern.startswith("(?")
+        ]
+        if len(mergeable) < 2:
+            return regexes
+        merged = re.compile(
+            "|".join(
+                f"(?i:{regex.pattern})" if regex.flags & re.IGNORECASE else f"(?:{regex.pattern})"
+                for regex in mergeable
+            )
+        )
+        return [merged, *(regex for regex in regexes if regex not in mergeable)]
 
 
 class NODE_ANY(NODE_OP):
@@ -278,21 +404,30 @@ class NODE_ROOT(NODE_OP):
         return (node.parent is None) != under_negation
 
 
+def _always_true(t: "Tree") -> bool:
+    return True
+
+
 class AbstractCondition(ABC):
     @abstractmethod
     def __repr__(self):
         raise NotImplementedError
 
-    def satisfies(self, t: "Tree", backref_table: dict[str, BackRef]) -> bool:
+    def satisfies(self, t: "Tree", bindings: Bindings) -> bool:
+        mark = bindings.mark()
+        g = self.searchNodeIterator(t, bindings)
         try:
-            next(self.searchNodeIterator(t, backref_table))
+            next(g)
         except StopIteration:
             return False
         else:
             return True
+        finally:
+            g.close()
+            bindings.undo(mark)
 
     @abstractmethod
-    def searchNodeIterator(self, t: "Tree", backref_table: dict[str, BackRef]) -> Generator["Tree", None, None]:
+    def searchNodeIterator(self, t: "Tree", bindings: Bindings) -> Generator["Tree", None, None]:
         raise NotImplementedError
 
 
@@ -308,8 +443,8 @@ class Condition(AbstractCondition):
     def __repr__(self):
         return f"{self.relation_data} {self.node_descriptions}"
 
-    def searchNodeIterator(self, t: "Tree", backref_table: dict[str, BackRef]) -> Generator["Tree", None, None]:
-        for _ in self.relation_data.searchNodeIterator(t, self.node_descriptions, backref_table):
+    def searchNodeIterator(self, t: "Tree", bindings: Bindings) -> Generator["Tree", None, None]:
+        for _ in self.relation_data.searchNodeIterator(t, self.node_descriptions, bindings):
             yield t
 
 
@@ -361,21 +496,22 @@ class And(AbstractCondition):
     def __repr__(self):
         return " ".join(map(str, self.conditions))
 
-    def searchNodeIterator(self, t: "Tree", backref_table: dict[str, BackRef]) -> Generator["Tree", None, None]:
-        old_backref_table = deepcopy(backref_table)
+    def searchNodeIterator(self, t: "Tree", bindings: Bindings) -> Generator["Tree", None, None]:
+        # Matches are searched depth-first so that the bindings made along the
+        # way stay aligned with the match being yielded. Names bound inside
+        # this conjunction are not visible once it has been exhausted.
+        mark = bindings.mark()
+        try:
+            yield from self._search(t, bindings, 0)
+        finally:
+            bindings.undo(mark)
 
-        candidates: tuple[Tree, ...] = (t,)
-        for condition in self.conditions:
-            candidates = tuple(
-                node
-                for candidate in candidates
-                for node in condition.searchNodeIterator(candidate, backref_table)
-            )
-            if not candidates:
-                backref_table.clear()
-                backref_table.update(old_backref_table)
-                return
-        yield from candidates
+    def _search(self, t: "Tree", bindings: Bindings, i: int) -> Generator["Tree", None, None]:
+        if i == len(self.conditions):
+            yield t
+            return
+        for node in self.conditions[i].searchNodeIterator(t, bindings):
+            yield from self._search(node, bindings, i + 1)
 
     def append_condition(self, other_condition: AbstractCondition):
         self.check_name(other_condition)
@@ -411,9 +547,9 @@ class Or(AbstractCondition):
     def __repr__(self):
         return f"[ {' || '.join(map(str, self.conditions))} ]"
 
-    def searchNodeIterator(self, t: "Tree", backref_table: dict[str, BackRef]) -> Generator["Tree", None, None]:
+    def searchNodeIterator(self, t: "Tree", bindings: Bindings) -> Generator["Tree", None, None]:
         for condition in self.conditions:
-            yield from condition.searchNodeIterator(t, backref_table)
+            yield from condition.searchNodeIterator(t, bindings)
 
     def append_condition(self, other_condition):
         self.conditions.append(other_condition)
@@ -449,18 +585,20 @@ class Not(AbstractCondition):
     def __repr__(self):
         return f"!{self.condition}"
 
-    def searchNodeIterator(self, t: "Tree", backref_table: dict[str, BackRef]) -> Generator["Tree", None, None]:
+    def searchNodeIterator(self, t: "Tree", bindings: Bindings) -> Generator["Tree", None, None]:
         # If sub-condition matchesm 'not sub-condition' doesn't. Sub-condition
-        # might modify the backrefs_map on successful match, but since
+        # might modify the bindings on successful match, but since
         # 'not sub-condition' doesn't match, these changes shouldn't be visible
         # to the outside world.
-        copy = deepcopy(backref_table)
+        mark = bindings.mark()
+        g = self.condition.searchNodeIterator(t, bindings)
         try:
-            next(self.condition.searchNodeIterator(t, copy))
-        except StopIteration:
+            matched = next(g, None) is not None
+        finally:
+            g.close()
+            bindings.undo(mark)
+        if not matched:
             yield t
-        else:
-            return
 
 
 class Opt(AbstractCondition):
@@ -470,8 +608,8 @@ class Opt(AbstractCondition):
     def __repr__(self):
         return f"?[{self.condition}]"
 
-    def searchNodeIterator(self, t: "Tree", backref_table: dict[str, BackRef]) -> Generator["Tree", None, None]:
-        g = self.condition.searchNodeIterator(t, backref_table)
+    def searchNodeIterator(self, t: "Tree", bindings: Bindings) -> Generator["Tree", None, None]:
+        g = self.condition.searchNodeIterator(t, bindings)
         try:
             node = next(g)
         except StopIteration:
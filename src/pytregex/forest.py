@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+
+import struct
+import sys
+import zlib
+from array import array
+from bisect import bisect_right
+from collections.abc import Generator, Iterable, Iterator
+from typing import IO, Optional
+
+from .tree import LabelTable, Tree, TreeIndex
+
+NO_NODE = -1
+
+# binary format of dump() and load(), all little-endian:
+#   header       magic, format version, flags, number of trees, number of nodes, number of labels,
+#                size of the label table
+#   label table  the labels encoded in UTF-8 and separated by NUL bytes, in the order of their IDs
+#   arrays       tree_offset, then parent, first_child, next_sibling, label_id, preorder, postorder and
+#                size, as 4-byte signed integers
+# with FLAG_ZLIB set, everything after the header is a single zlib stream
+MAGIC = b"PTRXFRST"
+FORMAT_VERSION = 2
+FLAG_ZLIB = 1
+_HEADER = struct.Struct("<8sIIQQQQ")
+_NODE_ARRAYS = ("parent", "first_child", "next_sibling", "label_id", "preorder", "postorder", "size")
+
+
+class Forest:
+    """
+    A whole parsed corpus stored as parallel arrays (struct of arrays) instead
+    of linked Tree objects. Nodes are numbered in preorder across the corpus,
+    so the nodes of a tree, and the descendants of a node, are contiguous
+    index ranges. For node i:
+
+        parent[i]        index of its parent, NO_NODE for roots
+        first_child[i]   index of its first child, NO_NODE for leaves
+        next_sibling[i]  index of its right sister, NO_NODE for last children
+        label_id[i]      ID of its label in self.labels, NO_NODE for None labels
+        preorder[i]      preorder number within its tree
+        postorder[i]     postorder number within its tree
+        size[i]          number of nodes in its subtree, including itself
+
+    and tree_offset[k] is the index of the root of the kth tree. Trees are
+    materialized lazily as Tree objects on access, so that patterns and
+    relations run on them unchanged.
+    """
+
+    def __init__(self, labels: Optional[LabelTable] = None) -> None:
+        self.labels = LabelTable() if labels is None else labels
+        self.parent = array("i")
+        self.first_child = array("i")
+        self.next_sibling = array("i")
+        self.label_id = array("i")
+        self.preorder = array("i")
+        self.postorder = array("i")
+        self.size = array("i")
+        self.tree_offset = array("i")
+
+    def __len__(self) -> int:
+        return len(self.tree_offset)
+
+    def __getitem__(self, index: int) -> Tree:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("forest index out of range")
+        return self.tree(index)
+
+    def __iter__(self) -> Iterator[Tree]:
+        return (self.tree(k) for k in range(len(self)))
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.parent)
+
+    @classmethod
+    def from_trees(cls, trees: Iterable[Tree], labels: Optional[LabelTable] = None) -> "Forest":
+        forest = cls(labels)
+        for tree in trees:
+            forest.add_tree(tree)
+        return forest
+
+    @classmethod
+    def fromstring(cls, s: str, labels: Optional[LabelTable] = None) -> "Forest":
+        forest = cls(labels)
+        for tree in Tree.fromstring(s, labels=forest.labels):
+            forest.add_tree(tree)
+        return forest
+
+    def dump(self, fileobj: IO[bytes], *, compress: bool = True) -> None:
+        """
+        Write the forest to a binary file object, in the format read back by
+        load().
+
+        param compress Whether to zlib-compress the labels and arrays, which
+        makes the file several times smaller for a small cost in load()
+        """
+        if any("\0" in label for label in self.labels):
+            raise ValueError("labels containing NUL characters cannot be dumped")
+        label_blob = "\0".join(self.labels).encode("utf-8")
+        parts = [label_blob]
+        for name in ("tree_offset", *_NODE_ARRAYS):
+            arr = getattr(self, name)
+            if arr.itemsize != 4:
+                raise ValueError(f"unsupported array item size {arr.itemsize}, expected 4")
+            if sys.byteorder == "big":
+                arr = array(arr.typecode, arr)
+                arr.byteswap()
+            parts.append(arr.tobytes())
+        payload = b"".join(parts)
+
+        flags = FLAG_ZLIB if compress else 0
+        header = _HEADER.pack(
+            MAGIC, FORMAT_VERSION, flags, len(self), self.num_nodes, len(self.labels), len(label_blob)
+        )
+        fileobj.write(header)
+        fileobj.write(zlib.compress(payload) if compress else payload)
+
+    @classmethod
+    def load(cls, fileobj: IO[bytes]) -> "Forest":
+        """
+        Read a forest written by dump() with a single bulk read. Labels and
+        arrays are copied in wholesale rather than rebuilt node by node.
+        """
+        data = fileobj.read()
+        flags, num_trees, num_nodes, num_labels, label_size = cls._unpack_header(data)
+        payload = memoryview(zlib.decompress(data[_HEADER.size :]) if flags & FLAG_ZLIB else data)
+        pos = 0 if flags & FLAG_ZLIB else _HEADER.size
+
+        forest = cls()
+        if num_labels > 0:
+            for label in bytes(payload[pos : pos + label_size]).decode("utf-8").split("\0"):
+                forest.labels.intern(label)
+        if len(forest.labels) != num_labels:
+            raise ValueError("corrupt label table in forest file")
+        pos += label_size
+        for name, n in (("tree_offset", num_trees), *((name, num_nodes) for name in _NODE_ARRAYS)):
+            arr = getattr(forest, name)
+            if arr.itemsize != 4:
+                raise ValueError(f"unsupported array item size {arr.itemsize}, expected 4")
+            end = pos + 4 * n
+            if end > len(payload):
+                raise ValueError("truncated forest file")
+            arr.frombytes(payload[pos:end])
+            if sys.byteorder == "big":
+                arr.byteswap()
+            pos = end
+        return forest
+
+    @classmethod
+    def count_trees(cls, fileobj: IO[bytes]) -> int:
+        """Return the number of trees in a forest file from its header alone, without loading it."""
+        return cls._unpack_header(fileobj.read(_HEADER.size))[1]
+
+    @classmethod
+    def _unpack_header(cls, data: bytes) -> tuple[int, int, int, int, int]:
+        if len(data) < _HEADER.size or data[:8] != MAGIC:
+            raise ValueError("not a pytregex forest file")
+        _, version, *fields = _HEADER.unpack_from(data)
+        if version != FORMAT_VERSION:
+            raise ValueError(f"unsupported forest format version {version}, expected {FORMAT_VERSION}")
+        flags, num_trees, num_nodes, num_labels, label_size = fields
+        return flags, num_trees, num_nodes, num_labels, label_size
+
+    def add_tree(self, tree: Tree) -> None:
+        offset = len(self.parent)
+        self.tree_offset.append(offset)
+        label_id = self.labels.id
+
+        # preorder walk, parents are always numbered before their children
+        preorder = 0
+        stack: list[tuple[Tree, int]] = [(tree, NO_NODE)]
+        prev_sibling: dict[int, int] = {}
+        while stack:
+            node, parent = stack.pop()
+            i = offset + preorder
+            self.parent.append(parent)
+            self.first_child.append(NO_NODE)
+            self.next_sibling.append(NO_NODE)
+            self.label_id.append(NO_NODE if node.label is None else label_id(node.label))
+            self.preorder.append(preorder)
+            self.postorder.append(NO_NODE)
+            self.size.append(1)
+            preorder += 1
+
+            if parent != NO_NODE:
+                if (sister := prev_sibling.get(parent)) is None:
+                    self.first_child[parent] = i
+                else:
+                    self.next_sibling[sister] = i
+                prev_sibling[parent] = i
+            stack.extend((kid, i) for kid in reversed(node.children))
+
+        # postorder numbers and subtree sizes: children are contiguous ranges
+        # after their parent, and are numbered before it
+        postorder = 0
+        stack_i: list[tuple[int, bool]] = [(offset, False)]
+        while stack_i:
+            i, visited = stack_i.pop()
+            if visited:
+                self.postorder[i] = postorder
+                postorder += 1
+                if (parent := self.parent[i]) != NO_NODE:
+                    self.size[parent] += self.size[i]
+                continue
+            stack_i.append((i, True))
+            stack_i.extend((kid, False) for kid in reversed(list(self.children(i))))
+
+    def tree(self, k: int) -> Tree:
+        """Materialize the kth tree as linked Tree objects."""
+        start = self.tree_offset[k]
+        end = self.tree_offset[k + 1] if k + 1 < len(self.tree_offset) else len(self.parent)
+        label = self.labels.label
+        # labels in the table are normalized already
+        labels = [None if id_ == NO_NODE else label(id_) for id_ in self.label_id[start:end]]
+        nodes = Tree._from_preorder(labels, self.parent[start:end], start)
+        # the positional index comes from the stored columns, without walking the tree
+        TreeIndex.from_preorder(nodes, self.size[start:end].tolist(), self.postorder[start:end].tolist())
+        return nodes[0]
+
+    def tree_index(self, i: int) -> int:
+        """Return the index of the tree that node i belongs to."""
+        return bisect_right(self.tree_offset, i) - 1
+
+    def label(self, i: int) -> Optional[str]:
+        id_ = self.label_id[i]
+        return None if id_ == NO_NODE else self.labels.label(id_)
+
+    def children(self, i: int) -> Generator[int, None, None]:
+        kid = self.first_child[i]
+        while kid != NO_NODE:
+            yield kid
+            kid = self.next_sibling[kid]
+
+    def is_leaf(self, i: int) -> bool:
+        return self.first_child[i] == NO_NODE
+
+    def subtree_size(self, i: int) -> int:
+        """Number of nodes in the subtree rooted at node i, including i."""
+        return self.size[i]
+
+    def dominates(self, i: int, j: int) -> bool:
+        """Whether node i properly dominates node j."""
+        if i == j or self.tree_index(i) != self.tree_index(j):
+            return False
+        return self.preorder[i] < self.preorder[j] and self.postorder[j] < self.postorder[i]
+
+    def descendants(self, i: int) -> range:
+        """Indices of the proper descendants of node i, in preorder."""
+        return range(i + 1, i + self.size[i])
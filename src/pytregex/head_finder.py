@@ -1,11 +1,36 @@
 #!/usr/bin/env python3
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
 if TYPE_CHECKING:
-    from .tree import Tree
+    from .tree import Tree, TreeIndex
 
 
 class HeadFinder:
     def determineHead(self, t: "Tree"):
         raise NotImplementedError
+
+    def annotate(self, index: "TreeIndex") -> tuple[list[Optional["Tree"]], list["Tree"]]:
+        """
+        Return the head child and the head terminal of every node of the
+        indexed tree, by preorder number. The head terminal is where the chain
+        of head children ends, normally a leaf. The annotation pass runs
+        bottom-up once per tree and is then cached on the index, so that it
+        goes away along with a stale or dropped index.
+        """
+        if (ret := index.head_annotations.get(self)) is not None:
+            return ret
+
+        nodes = index.nodes
+        head_child: list[Optional[Tree]] = [None] * len(nodes)
+        head_terminal = list(nodes)
+        for pre in range(len(nodes) - 1, -1, -1):
+            node = nodes[pre]
+            if node.children:
+                head = self.determineHead(node)
+                head_child[pre] = head
+                if head is not None:
+                    # children come after their parent in preorder
+                    head_terminal[pre] = head_terminal[head._pos]
+        index.head_annotations[self] = ret = (head_child, head_terminal)
+        return ret
@@ -8,6 +8,7 @@ from ...abstract_collins_head_finder import AbstractCollinsHeadFinder
 
 class ChineseHeadFinder(AbstractCollinsHeadFinder):
     def __init__(self) -> None:
+        super().__init__()
         leftExceptPunct = ["leftexcept", "PU"]
         rightExceptPunct = ["rightexcept", "PU"]
 
@@ -125,3 +126,4 @@ class ChineseHeadFinder(AbstractCollinsHeadFinder):
             "OTH": [leftExceptPunct],
             "SKIP": [leftExceptPunct],
         }
+        self.compile_rules()
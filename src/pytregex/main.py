@@ -2,14 +2,42 @@
 
 import argparse
 import contextlib
+import functools
 import glob
 import logging
 import os
 import sys
+from collections.abc import Generator, Iterable
 
-from .tregex import TregexPattern
 from .utils import TregexProcedureResult
 
+# typing.TYPE_CHECKING without importing typing, see __init__.py
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import IO
+
+    from .forest import Forest
+    from .tree import Tree
+    from .tregex import TregexPattern
+
+# input name; text of a batch of trees, byte range of a batch in the named
+# file, or tree range for forest files, or None to read the whole file;
+# number of the first tree
+MatchTask = tuple[str, "str | tuple[int, int] | None", int]
+
+# compressed inputs are decompressed on the fly by the module named here
+COMPRESSED_SUFFIXES = {".gz": "gzip", ".bz2": "bz2", ".xz": "lzma"}
+
+# binary forests written by `pytregex convert`
+FOREST_SUFFIX = ".forest"
+
+# trees handed to a worker at a time when files are split across workers
+TREES_PER_TASK = 256
+
+# files larger than this, in bytes on disk, are always split into batches of
+# TREES_PER_TASK trees, so that no worker holds the output of a whole big file
+SPLIT_FILE_SIZE = 1 << 20
+
 
 class TregexUI:
     def __init__(self) -> None:
@@ -45,6 +73,7 @@ class TregexUI:
         self.pattern_parser = self.create_pattern_parser(subparsers)
         self.explain_parser = self.create_explain_parser(subparsers)
         self.pprint_parser = self.create_pprint_parser(subparsers)
+        self.convert_parser = self.create_convert_parser(subparsers)
         return parser
 
     def create_pattern_parser(self, subparsers: argparse._SubParsersAction) -> argparse.ArgumentParser:
@@ -72,6 +101,20 @@ class TregexUI:
             default=False,
             help="Suppresses printing of matches, so only the number of matches is printed.",
         )
+        pattern_parser.add_argument(
+            "-f",
+            action="store_true",
+            dest="print_filename",
+            default=False,
+            help="Print the name of the file each match is found in before the match.",
+        )
+        pattern_parser.add_argument(
+            "-n",
+            action="store_true",
+            dest="print_tree_number",
+            default=False,
+            help="Print the number of the tree, within its file, each match is found in before the match.",
+        )
         pattern_parser.add_argument(
             "-h",
             metavar="<handle>",
@@ -84,6 +127,24 @@ class TregexUI:
                 " a single command line."
             ),
         )
+        pattern_parser.add_argument(
+            "-j",
+            "--jobs",
+            metavar="<N>",
+            type=int,
+            default=1,
+            help=(
+                "Match in N worker processes, 0 for one per available CPU. Input files are spread"
+                " across the workers, or, when there are fewer files than workers or for large files,"
+                " batches of trees within each file."
+            ),
+        )
+        pattern_parser.add_argument(
+            "--unordered",
+            action="store_true",
+            default=False,
+            help="With -j, print matches as workers finish instead of in input order.",
+        )
         pattern_parser.add_argument(
             "--version",
             action="store_true",
@@ -117,14 +178,40 @@ class TregexUI:
         pprint_parser.set_defaults(func=self.run_pprint_args)
         return pprint_parser
 
-    def run_pattern_args(self, options: argparse.Namespace) -> TregexProcedureResult:
-        if options.pattern is None:
-            self.pattern_parser.print_help()
-            return True, None
+    def create_convert_parser(self, subparsers: argparse._SubParsersAction) -> argparse.ArgumentParser:
+        convert_parser = subparsers.add_parser(
+            "convert",
+            help="convert constituency trees to a binary forest file, which loads faster than text",
+        )
+        convert_parser.add_argument(
+            "-o",
+            metavar="<output>",
+            dest="output",
+            help=f"The forest file to write, conventionally ending in {FOREST_SUFFIX}.",
+        )
+        convert_parser.add_argument(
+            "-filter",
+            action="store_true",
+            dest="is_stdin",
+            default=False,
+            help="Read tree input from stdin.",
+        )
+        convert_parser.add_argument(
+            "--uncompressed",
+            action="store_false",
+            dest="compress",
+            default=True,
+            help="Write the forest without zlib compression, larger but a little faster to load.",
+        )
+        self.__add_log_levels(convert_parser)
+        convert_parser.set_defaults(func=self.run_convert_args)
+        return convert_parser
 
-        self.tree_string = None
+    def verify_input(self, is_stdin: bool) -> TregexProcedureResult:
+        """Check the input paths and expand directories and globs into `verified_ifile_list`."""
+        self.is_stdin = is_stdin
         self.verified_ifile_list = None
-        if options.is_stdin:
+        if is_stdin:
             if self.ipath_list:
                 return (
                     False,
@@ -132,66 +219,214 @@ class TregexUI:
                         "\n".join(self.ipath_list)
                     ),
                 )
-            self.tree_string = sys.stdin.read()
         else:
             verified_ifile_list = []
             for path in self.ipath_list:
                 if os.path.isfile(path):
                     verified_ifile_list.append(path)
                 elif os.path.isdir(path):
-                    verified_ifile_list.extend(glob.glob(f"{path}{os.path.sep}*.txt"))
+                    verified_ifile_list.extend(
+                        sorted(
+                            ifile
+                            for suffix in ("", *COMPRESSED_SUFFIXES)
+                            for ifile in glob.glob(f"{path}{os.path.sep}*.txt{suffix}")
+                        )
+                    )
                 elif glob.glob(path):
-                    verified_ifile_list.extend(glob.glob(path))
+                    verified_ifile_list.extend(sorted(glob.glob(path)))
                 else:
                     return (False, f"No such file as \n\n{path}")
             if verified_ifile_list:
                 self.verified_ifile_list = verified_ifile_list
+        return True, None
+
+    def run_pattern_args(self, options: argparse.Namespace) -> TregexProcedureResult:
+        if options.pattern is None:
+            self.pattern_parser.print_help()
+            return True, None
+
+        success, err_msg = self.verify_input(options.is_stdin)
+        if not success:
+            return success, err_msg
 
         default_tree_string = (
             "(VP (VP (VBZ Try) (NP (NP (DT this) (NN wine)) (CC and) (NP (DT these) (NNS snails)))) (PUNCT .))"
         )
 
-        # run matcher
+        from .tregex import TregexPattern
+
+        pattern = TregexPattern(options.pattern)
+        if options.handles:
+            for handle in options.handles:
+                if handle not in pattern.backref_table:
+                    return (
+                        False,
+                        f'There is no matched node "{handle}"!  Did you specify such a label in the pattern?',
+                    )
+            logging.debug("Printing handles...")
+        elif not options.is_count:
+            logging.debug("Printing matches...")
+
+        if options.jobs < 0:
+            return False, f"The number of jobs must not be negative, not {options.jobs}"
+        jobs = options.jobs or available_cpu_count()
+        # only what workers need to format matches, `options` itself holds the parsers
+        output_options = argparse.Namespace(
+            handles=options.handles,
+            is_count=options.is_count,
+            print_filename=options.print_filename,
+            print_tree_number=options.print_tree_number,
+        )
+        if jobs == 1:
+            # input files are read one at a time, tree by tree, and matches are
+            # written out as they are found, so nothing is kept
+            results = (
+                (1, output)
+                for name, trees in self.iter_forests(default_tree_string)
+                for output in iter_match_output(pattern, trees, name, 0, output_options)
+            )
+        else:
+            results = self.iter_parallel_matches(options, jobs, default_tree_string, output_options)
+
+        match_count = 0
+        for count, output in results:
+            match_count += count
+            if output:
+                with contextlib.suppress(BrokenPipeError):
+                    sys.stdout.write(output)
+
+        if options.is_count and not options.handles:
+            with contextlib.suppress(BrokenPipeError):
+                sys.stdout.write(f"{match_count}\n")
+            return True, None
+        logging.info(f"There were {match_count} matches in total.")
+
+        return True, None
+
+    def iter_forests(self, default_tree_string: str) -> Generator[tuple[str, Iterable["Tree"]], None, None]:
+        """Yield the name and a lazy stream of trees of each input in turn."""
+        from .tree import Tree
+
         if self.verified_ifile_list is not None:
-            forests = []
             for ifile in self.verified_ifile_list:
                 logging.debug(f"Reading tree input from input {ifile}...")
-                with open(ifile, encoding="utf-8") as f:
-                    forests.append(f.read())
-            tree_string = "\n".join(forests)
-        elif self.tree_string is not None:
+                with open_trees(ifile) as trees:
+                    yield ifile, trees
+        elif self.is_stdin:
             logging.debug("Reading tree input from stdin...")
-            tree_string = self.tree_string
+            yield "(standard input)", Tree.iter_from_file(sys.stdin)
         else:
             logging.debug(f"No tree input. Using the default {default_tree_string}.")
-            tree_string = default_tree_string
+            yield "(default)", Tree.fromstring(default_tree_string)
+
+    def iter_tasks(self, jobs: int, default_tree_string: str) -> Generator["MatchTask", None, None]:
+        """
+        Yield the work units of a parallel run in input order: whole files,
+        which workers read themselves, or, when there are fewer files than
+        workers or for files above SPLIT_FILE_SIZE, batches of trees.
+        """
+        from .forest import Forest
+        from .tree import Tree
+        from .treebank import MappedTreebank
 
-        # from viztracer import VizTracer
-        # tracer = VizTracer()
-        # tracer.start()
-        pattern = TregexPattern(options.pattern)
-        matches = pattern.findall(tree_string)
-        # tracer.stop()
-        # tracer.save()
+        def batches(name: str, f: "IO[str]") -> Generator["MatchTask", None, None]:
+            first_tree = 0
+            for n, text in Tree.iter_text_batches(f, TREES_PER_TASK):
+                yield name, text, first_tree
+                first_tree += n
 
-        if options.handles:
-            logging.debug("Printing handles...")
-            for handle in options.handles:
-                handled_nodes = pattern.get_nodes(handle)
-                for node in handled_nodes:
-                    with contextlib.suppress(BrokenPipeError):
-                        sys.stdout.write(f"{node}\n")
+        if self.verified_ifile_list is not None:
+            split_files = len(self.verified_ifile_list) < jobs
+            for ifile in self.verified_ifile_list:
+                if not split_files and os.path.getsize(ifile) <= SPLIT_FILE_SIZE:
+                    yield ifile, None, 0
+                    continue
+                logging.debug(f"Splitting tree input from input {ifile}...")
+                if is_forest(ifile):
+                    # workers load the forest themselves, only the header is read here
+                    with open(ifile, "rb") as forest_file:
+                        num_trees = Forest.count_trees(forest_file)
+                    for first_tree in range(0, num_trees, TREES_PER_TASK):
+                        yield ifile, (first_tree, min(first_tree + TREES_PER_TASK, num_trees)), first_tree
+                    continue
+                if is_compressed(ifile):
+                    with open_input(ifile) as text_file:
+                        yield from batches(ifile, text_file)
+                    continue
+                # workers map the file themselves and are only told where their trees are
+                with MappedTreebank(ifile) as treebank:
+                    for first_tree, start, end in treebank.batches(TREES_PER_TASK):
+                        yield ifile, (start, end), first_tree
+        elif self.is_stdin:
+            logging.debug("Splitting tree input from stdin...")
+            yield from batches("(standard input)", sys.stdin)
         else:
-            if options.is_count:
-                with contextlib.suppress(BrokenPipeError):
-                    sys.stdout.write(f"{len(matches)}\n")
-                return True, None
-            logging.debug("Printing matches...")
-            for m in matches:
-                with contextlib.suppress(BrokenPipeError):
-                    sys.stdout.write(f"{m}\n")
-        logging.info(f"There were {len(matches)} matches in total.")
+            logging.debug(f"No tree input. Using the default {default_tree_string}.")
+            yield "(default)", default_tree_string, 0
+
+    def iter_parallel_matches(
+        self,
+        options: argparse.Namespace,
+        jobs: int,
+        default_tree_string: str,
+        output_options: argparse.Namespace,
+    ) -> Generator[tuple[int, str], None, None]:
+        """
+        Run the tasks of iter_tasks() in a pool of `jobs` processes and yield
+        their results, in input order unless --unordered is given. At most a
+        few tasks per worker are in flight, so memory stays bounded however
+        large the input is.
+        """
+        from collections import deque
+        from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+        with ProcessPoolExecutor(
+            jobs, initializer=init_worker, initargs=(options.pattern, output_options)
+        ) as pool:
+            pending: deque = deque()
+
+            def drain(limit: int) -> Generator[tuple[int, str], None, None]:
+                while len(pending) > limit:
+                    if not options.unordered:
+                        yield pending.popleft().result()
+                        continue
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        pending.remove(future)
+                        yield future.result()
+
+            for task in self.iter_tasks(jobs, default_tree_string):
+                pending.append(pool.submit(run_task, task))
+                yield from drain(2 * jobs - 1)
+            yield from drain(0)
+
+    def run_convert_args(self, options: argparse.Namespace) -> TregexProcedureResult:
+        if options.output is None or (not self.ipath_list and not options.is_stdin):
+            self.convert_parser.print_help()
+            return True, None
+
+        success, err_msg = self.verify_input(options.is_stdin)
+        if not success:
+            return success, err_msg
+
+        from .forest import Forest
+        from .tree import Tree
+
+        forest = Forest()
+        if self.verified_ifile_list is not None:
+            for ifile in self.verified_ifile_list:
+                logging.debug(f"Reading tree input from input {ifile}...")
+                with open_trees(ifile) as trees:
+                    for tree in trees:
+                        forest.add_tree(tree)
+        else:
+            logging.debug("Reading tree input from stdin...")
+            for tree in Tree.iter_from_file(sys.stdin):
+                forest.add_tree(tree)
 
+        with open(options.output, "wb") as f:
+            forest.dump(f, compress=options.compress)
+        logging.info(f"Wrote {len(forest)} trees to {options.output}.")
         return True, None
 
     def run_explain_args(self, options: argparse.Namespace) -> TregexProcedureResult:
@@ -238,12 +473,135 @@ class TregexUI:
         return True, None
 
     def show_version(self) -> TregexProcedureResult:
-        from about import __version__
+        from .about import __version__
 
         print(__version__)
         return True, None
 
 
+def available_cpu_count() -> int:
+    """Return the number of CPUs this process may run on, which may be fewer than the machine has."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def is_compressed(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in COMPRESSED_SUFFIXES
+
+
+def is_forest(path: str) -> bool:
+    return path.endswith(FOREST_SUFFIX)
+
+
+def open_input(path: str) -> "IO[str]":
+    """
+    Open an input file as text, decompressing it as it is read when its
+    extension is one of COMPRESSED_SUFFIXES.
+    """
+    if not is_compressed(path):
+        return open(path, encoding="utf-8")
+
+    import importlib
+
+    module_name = COMPRESSED_SUFFIXES[os.path.splitext(path)[1].lower()]
+    return importlib.import_module(module_name).open(path, "rt", encoding="utf-8")
+
+
+@contextlib.contextmanager
+def open_trees(path: str) -> Generator[Iterable["Tree"], None, None]:
+    """
+    Give a lazy stream of the trees of an input file: plain files are
+    memory-mapped, compressed ones are decompressed as they are read, and
+    forests written by `pytregex convert` are loaded whole.
+    """
+    if is_forest(path):
+        from .forest import Forest
+
+        with open(path, "rb") as f:
+            yield Forest.load(f)
+    elif is_compressed(path):
+        from .tree import Tree
+
+        with open_input(path) as f:
+            yield Tree.iter_from_file(f)
+    else:
+        from .treebank import MappedTreebank
+
+        with MappedTreebank(path) as treebank:
+            yield treebank
+
+
+def match_prefix(options: argparse.Namespace, name: str, tree_index: int) -> str:
+    prefix = ""
+    if options.print_filename:
+        prefix += f"{name}:"
+    if options.print_tree_number:
+        prefix += f"{tree_index + 1}:"
+    return f"{prefix} " if prefix else prefix
+
+
+def iter_match_output(
+    pattern: "TregexPattern", trees: Iterable["Tree"], name: str, first_tree: int, options: argparse.Namespace
+) -> Generator[str, None, None]:
+    """
+    Match `pattern` against `trees`, the trees of input `name` from its
+    `first_tree`th one on, and yield the text to print for each match, which
+    is empty when only counting.
+    """
+    for m in pattern.finditer(trees):
+        if options.is_count and not options.handles:
+            yield ""
+            continue
+        prefix = match_prefix(options, name, first_tree + m.tree_index)
+        nodes = (m.get_node(handle) for handle in options.handles) if options.handles else (m.node,)
+        yield "".join(f"{prefix}{node}\n" for node in nodes if node is not None)
+
+
+# state of a worker process of `pattern -j`, set once by init_worker()
+_worker_pattern: "TregexPattern | None" = None
+_worker_options: "argparse.Namespace | None" = None
+
+
+def init_worker(pattern: str, options: argparse.Namespace) -> None:
+    global _worker_pattern, _worker_options
+
+    from .tregex import TregexPattern
+
+    _worker_pattern = TregexPattern(pattern)
+    _worker_options = options
+
+
+@functools.lru_cache(maxsize=1)
+def load_forest(path: str) -> "Forest":
+    """Load a forest file once per worker, for all the tree ranges of it the worker gets."""
+    from .forest import Forest
+
+    with open(path, "rb") as f:
+        return Forest.load(f)
+
+
+def run_task(task: MatchTask) -> tuple[int, str]:
+    """Return the number of matches in `task` and the text to print for them."""
+    from .tree import Tree
+    from .treebank import MappedTreebank
+
+    assert _worker_pattern is not None and _worker_options is not None
+    name, source, first_tree = task
+    with contextlib.ExitStack() as stack:
+        if isinstance(source, str):
+            trees: Iterable[Tree] = Tree.fromstring(source)
+        elif source is not None and is_forest(name):
+            forest = load_forest(name)
+            trees = (forest.tree(k) for k in range(*source))
+        elif source is not None:
+            trees = stack.enter_context(MappedTreebank(name)).iter_range(*source)
+        else:
+            trees = stack.enter_context(open_trees(name))
+        output = list(iter_match_output(_worker_pattern, trees, name, first_tree, _worker_options))
+    return len(output), "".join(output)
+
+
 def main() -> None:
     ui = TregexUI()
     success, err_msg = ui.run_args(sys.argv)
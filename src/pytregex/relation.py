@@ -2,14 +2,12 @@
 
 from abc import ABC, abstractmethod
 from collections.abc import Generator, Iterator
+from functools import cache
 from itertools import chain as _chain
 from typing import TYPE_CHECKING, Optional
 
-from .collins_head_finder import CollinsHeadFinder
-from .condition import BackRef
-
 if TYPE_CHECKING:
-    from .condition import NodeDescriptions
+    from .condition import Bindings, NodeDescriptions
     from .head_finder import HeadFinder
     from .tree import Tree
 
@@ -24,6 +22,17 @@ if TYPE_CHECKING:
 # TODO ROOT subclass
 
 
+@cache
+def default_head_finder() -> "HeadFinder":
+    """
+    Return the CollinsHeadFinder shared by the head relations, built on first
+    use so that importing pytregex does not pay for its rule tables.
+    """
+    from .collins_head_finder import CollinsHeadFinder
+
+    return CollinsHeadFinder()
+
+
 class AbstractRelation(ABC):
     symbol: Optional[str] = None
 
@@ -43,23 +52,11 @@ class DOMINATES(AbstractRelation):
 
     @classmethod
     def satisfies(cls, t1: "Tree", t2: "Tree") -> bool:
-        """
-        `t1` and `t2` should be part of the same tree
-        """
-        while t2.parent is not None:
-            if t2.parent is t1:
-                return True
-            else:
-                t2 = t2.parent
-        return False
+        return t1.get_index().dominates(t1, t2)
 
     @classmethod
     def searchNodeIterator(cls, t: "Tree") -> Generator["Tree", None, None]:
-        iterator = iter(t.children)
-        while (node := next(iterator, None)) is not None:
-            yield node
-            if not node.isLeaf():
-                iterator = _chain(node.children, iterator)
+        yield from t.get_index().descendants(t)
 
 
 class DOMINATED_BY(AbstractRelation):
@@ -152,10 +149,7 @@ class HAS_LEFTMOST_CHILD(AbstractRelation):
 class HAS_RIGHTMOST_DESCENDANT(AbstractRelation):
     @classmethod
     def satisfies(cls, t1: "Tree", t2: "Tree") -> bool:
-        if t1.isLeaf():
-            return False
-        lastChild = t1.children[-1]
-        return lastChild is t2 or HAS_RIGHTMOST_DESCENDANT.satisfies(lastChild, t2)
+        return t1.get_index().has_rightmost_descendant(t1, t2)
 
     @classmethod
     def searchNodeIterator(cls, t: "Tree") -> Generator["Tree", None, None]:
@@ -183,10 +177,7 @@ class RIGHTMOST_DESCENDANT_OF(AbstractRelation):
 class HAS_LEFTMOST_DESCENDANT(AbstractRelation):
     @classmethod
     def satisfies(cls, t1: "Tree", t2: "Tree") -> bool:
-        if t1.isLeaf():
-            return False
-        first_child = t1.children[0]
-        return first_child is t2 or HAS_LEFTMOST_DESCENDANT.satisfies(first_child, t2)
+        return t1.get_index().has_leftmost_descendant(t1, t2)
 
     @classmethod
     def searchNodeIterator(cls, t: "Tree") -> Generator["Tree", None, None]:
@@ -214,27 +205,16 @@ class LEFTMOST_DESCENDANT_OF(AbstractRelation):
 class LEFT_SISTER_OF(AbstractRelation):
     @classmethod
     def satisfies(cls, t1: "Tree", t2: "Tree") -> bool:
-        # t1 is t2 or t1 is root
-        if t1 is t2 or t1.parent is None:
+        # t1 is root or t1 and t2 are not sisters
+        if t1.parent is None or t2.parent is not t1.parent:
             return False
-
-        sisters = t1.parent.children
-        for i in range(len(sisters) - 1, 0, -1):  # from sisters[-1] to sisters[1]
-            if sisters[i] is t1:
-                return False
-            if sisters[i] is t2:
-                return True
-        return False
+        return t1.get_sister_index() < t2.get_sister_index()
 
     @classmethod
     def searchNodeIterator(cls, t: "Tree") -> Generator["Tree", None, None]:
         parent_ = t.parent
         if parent_ is not None:
-            for child in reversed(parent_.children):
-                # https://stackoverflow.com/questions/16465046/why-is-reversing-a-list-with-slicing-slower-than-reverse-iterator
-                if child is t:
-                    break
-                yield child
+            yield from reversed(parent_.children[t.get_sister_index() + 1 :])
 
 
 class RIGHT_SISTER_OF(AbstractRelation):
@@ -246,36 +226,26 @@ class RIGHT_SISTER_OF(AbstractRelation):
     def searchNodeIterator(cls, t: "Tree") -> Generator["Tree", None, None]:
         parent_ = t.parent
         if parent_ is not None:
-            for child in parent_.children:
-                if child is t:
-                    break
-                yield child
+            i = t.get_sister_index()
+            yield from parent_.children[:i] if i >= 0 else parent_.children
 
 
 class IMMEDIATE_LEFT_SISTER_OF(AbstractRelation):
     @classmethod
     def satisfies(cls, t1: "Tree", t2: "Tree") -> bool:
-        # t1 is t2 or t1 is root
-        if t1 is t2 or t1.parent is None:
+        # t1 is root or t1 and t2 are not sisters
+        if t1.parent is None or t2.parent is not t1.parent:
             return False
-
-        sisters = t1.parent.children
-        for i in range(len(sisters) - 1, 0, -1):  # from sisters[-1] to sisters[1]
-            if sisters[i] is t1:
-                return False
-            if sisters[i] is t2:
-                return sisters[i - 1] is t1
-        return False
+        i = t1.get_sister_index()
+        return i >= 0 and t2.get_sister_index() == i + 1
 
     @classmethod
     def searchNodeIterator(cls, t: "Tree") -> Generator["Tree", None, None]:
         parent_ = t.parent
         if parent_ is not None:
-            for _i, child in enumerate(parent_.children):
-                if child is t:
-                    break
-            if _i + 1 < parent_.numChildren():
-                yield parent_.children[_i + 1]
+            i = t.get_sister_index()
+            if 0 <= i < parent_.numChildren() - 1:
+                yield parent_.children[i + 1]
 
 
 class IMMEDIATE_RIGHT_SISTER_OF(AbstractRelation):
@@ -287,11 +257,9 @@ class IMMEDIATE_RIGHT_SISTER_OF(AbstractRelation):
     def searchNodeIterator(cls, t: "Tree") -> Generator["Tree", None, None]:
         parent_ = t.parent
         if parent_ is not None:
-            for _i, child in enumerate(parent_.children):
-                if child is t:
-                    break
-            if _i > 0:
-                yield parent_.children[_i - 1]
+            i = t.get_sister_index()
+            if i > 0:
+                yield parent_.children[i - 1]
 
 
 class PARENT_OF(AbstractRelation):
@@ -328,10 +296,12 @@ class SISTER_OF(AbstractRelation):
     def searchNodeIterator(cls, t: "Tree") -> Generator["Tree", None, None]:
         parent_ = t.parent
         if parent_ is not None:
-            for sister in parent_.children:
-                if sister is t:
-                    continue
-                yield sister
+            i = t.get_sister_index()
+            if i < 0:
+                yield from parent_.children
+            else:
+                yield from parent_.children[:i]
+                yield from parent_.children[i + 1 :]
 
 
 class EQUALS(AbstractRelation):
@@ -360,13 +330,7 @@ class PARENT_EQUALS(AbstractRelation):
 class UNARY_PATH_ANCESTOR_OF(AbstractRelation):
     @classmethod
     def satisfies(cls, t1: "Tree", t2: "Tree") -> bool:
-        if t1.isLeaf() or t1.numChildren() > 1:
-            return False
-        only_child = t1.children[0]
-        if only_child is t2:
-            return True
-        else:
-            return UNARY_PATH_ANCESTOR_OF.satisfies(only_child, t2)
+        return t1.get_index().has_unary_path(t1, t2)
 
     @classmethod
     def searchNodeIterator(cls, t: "Tree") -> Generator["Tree", None, None]:
@@ -391,42 +355,31 @@ class UNARY_PATH_DESCEDANT_OF(AbstractRelation):
 
 
 class HEADS(AbstractRelation):
-    hf = CollinsHeadFinder()
-
     @classmethod
     def satisfies(cls, t1: "Tree", t2: "Tree", headFinder: Optional["HeadFinder"] = None) -> bool:
         if t2.isLeaf():
             return False
-        elif t2.is_preterminal():
-            return t2.firstChild() is t1
-        else:
-            if headFinder is None:
-                headFinder = cls.hf
-            head = headFinder.determineHead(t2)
-            if head is None:
-                return False
-            elif head is t1:
-                return True
-            else:
-                return cls.satisfies(t1, head, headFinder)
+        if headFinder is None:
+            headFinder = default_head_finder()
+        return t2.get_index().heads_of(t1, t2, headFinder)
 
     @classmethod
     def searchNodeIterator(
         cls, t: "Tree", headFinder: Optional["HeadFinder"] = None
     ) -> Generator["Tree", None, None]:
         if headFinder is None:
-            headFinder = cls.hf
+            headFinder = default_head_finder()
 
+        index = t.get_index()
+        head_child = index.heads(headFinder)[0]
         parent_ = t.parent
-        while parent_ is not None and headFinder.determineHead(parent_) is t:
+        while parent_ is not None and head_child[parent_._pos] is t:
             yield parent_
             t = parent_
             parent_ = parent_.parent
 
 
 class HEADED_BY(AbstractRelation):
-    hf = CollinsHeadFinder()
-
     @classmethod
     def satisfies(cls, t1: "Tree", t2: "Tree", hf: Optional["HeadFinder"] = None) -> bool:
         return HEADS.satisfies(t2, t1, hf)
@@ -436,22 +389,21 @@ class HEADED_BY(AbstractRelation):
         cls, t: "Tree", headFinder: Optional["HeadFinder"] = None
     ) -> Generator["Tree", None, None]:
         if headFinder is None:
-            headFinder = cls.hf
+            headFinder = default_head_finder()
         if not t.isLeaf():
-            head = headFinder.determineHead(t)
+            head_child = t.get_index().heads(headFinder)[0]
+            head = head_child[t._pos]
             while head is not None:
                 yield head
-                head = headFinder.determineHead(head)
+                head = head_child[head._pos]
 
 
 class IMMEDIATELY_HEADS(AbstractRelation):
-    hf = CollinsHeadFinder()
-
     @classmethod
     def satisfies(cls, t1: "Tree", t2: "Tree", headFinder: Optional["HeadFinder"] = None) -> bool:
         if headFinder is None:
-            headFinder = cls.hf
-        return headFinder.determineHead(t2) is t1
+            headFinder = default_head_finder()
+        return t2.get_index().head(t2, headFinder) is t1
 
     @classmethod
     def searchNodeIterator(
@@ -460,14 +412,12 @@ class IMMEDIATELY_HEADS(AbstractRelation):
         parent_ = t.parent
         if parent_ is not None:  # if t is not root
             if headFinder is None:
-                headFinder = cls.hf
-            if headFinder.determineHead(parent_) is t:
+                headFinder = default_head_finder()
+            if parent_.get_index().head(parent_, headFinder) is t:
                 yield parent_
 
 
 class IMMEDIATELY_HEADED_BY(AbstractRelation):
-    hf = CollinsHeadFinder()
-
     @classmethod
     def satisfies(cls, t1: "Tree", t2: "Tree", headFinder: Optional["HeadFinder"] = None) -> bool:
         return IMMEDIATELY_HEADS.satisfies(t2, t1, headFinder)
@@ -479,8 +429,8 @@ class IMMEDIATELY_HEADED_BY(AbstractRelation):
         if t.isLeaf():
             return
         if headFinder is None:
-            headFinder = cls.hf
-        head = headFinder.determineHead(t)
+            headFinder = default_head_finder()
+        head = t.get_index().head(t, headFinder)
         if head is not None:
             yield head
 
@@ -488,103 +438,64 @@ class IMMEDIATELY_HEADED_BY(AbstractRelation):
 class PRECEDES(AbstractRelation):
     @classmethod
     def satisfies(cls, t1: "Tree", t2: "Tree") -> bool:
-        return t1.rightEdge() <= t2.leftEdge()
+        index = t1.get_index()
+        return t2._index is index and index.right[t1._pos] <= index.left[t2._pos]
 
     @classmethod
     def searchNodeIterator(cls, t: "Tree") -> Generator["Tree", None, None]:
-        searchStack: list[Tree] = []
-        current: Optional[Tree] = t
-        parent_: Optional[Tree] = t.parent
-        while parent_ is not None:
-            for kid in reversed(parent_.children):
-                if kid is current:
-                    break
-                searchStack.append(kid)
-            current = parent_
-            parent_ = parent_.parent
-        while searchStack:
-            next = searchStack.pop()
-            yield next
-            searchStack.extend(reversed(next.children))
+        yield from t.get_index().following(t)
 
 
 class IMMEDIATELY_PRECEDES(AbstractRelation):
     @classmethod
     def satisfies(cls, t1: "Tree", t2: "Tree") -> bool:
-        return t1.rightEdge() == t2.leftEdge()
+        index = t1.get_index()
+        return t2._index is index and index.right[t1._pos] == index.left[t2._pos]
 
     @classmethod
     def searchNodeIterator(cls, t: "Tree") -> Generator["Tree", None, None]:
-        current: Optional[Tree] = None
-        parent_: Optional[Tree] = t
-        while True:
-            current = parent_
-            parent_ = parent_.parent  # type: ignore
-            if parent_ is None:
-                return
-            if parent_.lastChild() is not current:
-                break
-        for _i, kid in enumerate(parent_.children):
-            if kid is current:
-                break
-        # Use i+1 won't cause IndexError because current is not the last child
-        next = parent_.children[_i + 1]
-        while True:
+        # the first node after the subtree of t in preorder starts right after
+        # t's last leaf, and so does each first child below it
+        index = t.get_index()
+        nodes = index.nodes
+        pre = t._pos + index.size[t._pos]
+        while pre < len(nodes):
+            next = nodes[pre]
             yield next
             if next.isLeaf():
                 break
-            next = next.firstChild()
+            pre += 1
 
 
 class FOLLOWS(AbstractRelation):
     @classmethod
     def satisfies(cls, t1: "Tree", t2: "Tree") -> bool:
-        return t2.rightEdge() <= t1.leftEdge()
+        return PRECEDES.satisfies(t2, t1)
 
     @classmethod
     def searchNodeIterator(cls, t: "Tree") -> Generator["Tree", None, None]:
-        searchStack: list[Tree] = []
-        current: Optional[Tree] = t
-        parent_: Optional[Tree] = t.parent
-        while parent_ is not None:
-            for kid in parent_.children:
-                if kid is current:
-                    break
-                searchStack.append(kid)
-            current = parent_
-            parent_ = parent_.parent
-        while searchStack:
-            next = searchStack.pop()
-            yield next
-            searchStack.extend(reversed(next.children))
+        yield from t.get_index().preceding(t)
 
 
 class IMMEDIATELY_FOLLOWS(AbstractRelation):
     @classmethod
     def satisfies(cls, t1: "Tree", t2: "Tree") -> bool:
-        return t2.rightEdge() == t1.leftEdge()
+        return IMMEDIATELY_PRECEDES.satisfies(t2, t1)
 
     @classmethod
     def searchNodeIterator(cls, t: "Tree") -> Generator["Tree", None, None]:
-        current: Optional[Tree] = None
-        parent_: Optional[Tree] = t
-        while True:
-            current = parent_
-            parent_ = parent_.parent  # type: ignore
-            if parent_ is None:
-                return
-            if parent_.firstChild() is not current:
-                break
-        for _i, kid in enumerate(parent_.children):
-            if kid is current:
-                break
-        # Use i-1 won't cause IndexError because current is not the first child
-        next = parent_.children[_i - 1]
-        while True:
-            yield next
-            if next.isLeaf():
-                break
-            next = next.lastChild()
+        index = t.get_index()
+        left = index.left[t._pos]
+        if left == 0:
+            return
+        # the nodes ending right before t are the ancestors of the preceding
+        # leaf that do not reach t, yielded top-down
+        chain = []
+        node: Optional[Tree] = index.leaves[left - 1]
+        while node is not None and index.right[node._pos] == left:
+            chain.append(node)
+            node = node.parent
+        yield from reversed(chain)
 
 
 class ANCESTOR_OF_LEAF(AbstractRelation):
@@ -594,12 +505,8 @@ class ANCESTOR_OF_LEAF(AbstractRelation):
 
     @classmethod
     def searchNodeIterator(cls, t: "Tree") -> Generator["Tree", None, None]:
-        iterator = iter(t.children)
-        while (node := next(iterator, None)) is not None:
-            if node.isLeaf():
-                yield node
-            else:
-                iterator = _chain(node.children, iterator)
+        if not t.isLeaf():
+            yield from t.get_index().leaves_of(t)
 
 
 class UNBROKEN_CATEGORY_DOMINATES(AbstractRelation):
@@ -764,18 +671,7 @@ class ANCESTOR_OF_ITH_LEAF(AbstractRelation):
 
         if t1 is t2 or not t2.isLeaf():
             return False
-
-        # this is kind of lazy if it somehow became a performance limitation, a
-        # recursive search would be faster
-        leaves = t1.getLeaves()
-        if len(leaves) < abs(leaf_num):
-            return False
-        if leaf_num > 0:  # noqa: SIM108
-            index = leaf_num - 1
-        else:
-            # eg, leafNum == -1 means we check leaves.size() - 1
-            index = len(leaves) + leaf_num
-        return leaves[index] is t2
+        return t1.get_index().ith_leaf(t1, leaf_num) is t2
 
     @classmethod
     def searchNodeIterator(cls, t: "Tree", leaf_num: int) -> Generator["Tree", None, None]:
@@ -783,12 +679,9 @@ class ANCESTOR_OF_ITH_LEAF(AbstractRelation):
             raise ValueError("Error -- no such thing as zeroth leaf!")
         if t.isLeaf():
             return
-        leaves = t.getLeaves()
-        if len(leaves) >= abs(leaf_num):
-            if leaf_num > 0:
-                yield leaves[leaf_num - 1]
-            else:
-                yield leaves[leaf_num]
+        leaf = t.get_index().ith_leaf(t, leaf_num)
+        if leaf is not None:
+            yield leaf
 
 
 ################################# RELATION DATA ################################
@@ -804,7 +697,7 @@ class AbstractRelationData(ABC):
 
     @abstractmethod
     def searchNodeIterator(
-        self, t: "Tree", node_descriptions: "NodeDescriptions", backref_table: dict[str, BackRef]
+        self, t: "Tree", node_descriptions: "NodeDescriptions", bindings: "Bindings"
     ) -> Generator["Tree", None, None]:
         raise NotImplementedError()
 
@@ -818,15 +711,31 @@ class RelationData(AbstractRelationData):
         super().__init__(op, symbol)
 
     def searchNodeIterator(
-        self, t: "Tree", node_descriptions: "NodeDescriptions", backref_table: dict[str, BackRef]
+        self, t: "Tree", node_descriptions: "NodeDescriptions", bindings: "Bindings"
     ) -> Generator["Tree", None, None]:
         for candidate in self.op.searchNodeIterator(t):
-            yield from node_descriptions.searchNodeIterator(candidate, backref_table, recursive=False)
+            yield from node_descriptions.searchNodeIterator(candidate, bindings, recursive=False)
 
     # def satisfies(self, this_node: "Tree", that_node: "Tree") -> bool:
     #     return self.op.satisfies(this_node, that_node)
 
 
+class HeadRelationData(AbstractRelationData):
+    """
+    Data of <#, >#, <<# and >>#, which determine heads with the head finder
+    the search was started with.
+    """
+
+    def __init__(self, op: type[AbstractRelation], symbol: str) -> None:
+        super().__init__(op, symbol)
+
+    def searchNodeIterator(
+        self, t: "Tree", node_descriptions: "NodeDescriptions", bindings: "Bindings"
+    ) -> Generator["Tree", None, None]:
+        for candidate in self.op.searchNodeIterator(t, bindings.head_finder):
+            yield from node_descriptions.searchNodeIterator(candidate, bindings, recursive=False)
+
+
 class RelationWithStrArgData(AbstractRelationData):
     def __init__(
         self,
@@ -839,10 +748,10 @@ class RelationWithStrArgData(AbstractRelationData):
         self.arg = arg
 
     def searchNodeIterator(
-        self, t: "Tree", node_descriptions: "NodeDescriptions", backref_table: dict[str, BackRef]
+        self, t: "Tree", node_descriptions: "NodeDescriptions", bindings: "Bindings"
     ) -> Generator["Tree", None, None]:
         for candidate in self.op.searchNodeIterator(t, self.arg):
-            yield from node_descriptions.searchNodeIterator(candidate, backref_table, recursive=False)
+            yield from node_descriptions.searchNodeIterator(candidate, bindings, recursive=False)
 
     # def satisfies(self, this_node: "Tree", that_node: "Tree") -> bool:
     #     return self.op.satisfies(this_node, that_node, self.arg)
@@ -860,10 +769,10 @@ class RelationWithNumArgData(AbstractRelationData):
         self.arg = arg
 
     def searchNodeIterator(
-        self, t: "Tree", node_descriptions: "NodeDescriptions", backref_table: dict[str, BackRef]
+        self, t: "Tree", node_descriptions: "NodeDescriptions", bindings: "Bindings"
     ) -> Generator["Tree", None, None]:
         for candidate in self.op.searchNodeIterator(t, self.arg):
-            yield from node_descriptions.searchNodeIterator(candidate, backref_table, recursive=False)
+            yield from node_descriptions.searchNodeIterator(candidate, bindings, recursive=False)
 
     # def searchNodeIterator(self, this_node: "Tree") -> Generator["Tree", None, None]:
     #     return self.op.searchNodeIterator(this_node, self.arg)
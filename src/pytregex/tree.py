@@ -1,11 +1,13 @@
 # translated from [CoreNLP](https://github.com/stanfordnlp/CoreNLP/blob/139893242878ecacde79b2ba1d0102b855526610/src/edu/stanford/nlp/trees/Tree.java)
 
 import re
+import sys
 from collections import deque
-from collections.abc import Generator, Iterator
+from collections.abc import Generator, Iterable, Iterator
+from functools import partial
 from io import StringIO
 from itertools import chain as _chain
-from typing import TYPE_CHECKING, Optional, Union
+from typing import IO, TYPE_CHECKING, Optional, Union
 
 from .peekable import peekable
 
@@ -19,19 +21,332 @@ RRB_ESCAPE: str = "-RRB-"
 SPACE_SEPARATOR: str = " "
 
 
+class LabelTable:
+    """
+    Per-corpus symbol table of node labels. Each distinct label is stored once
+    and handed out to every node carrying it, and gets a small integer ID in
+    order of first appearance. Labels are interned with sys.intern() so that
+    label checks against the (also interned) IDs of a compiled pattern are
+    identity compares.
+    """
+
+    def __init__(self) -> None:
+        self._ids: dict[str, int] = {}
+        self._labels: list[str] = []
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    def __contains__(self, label: str) -> bool:
+        return label in self._ids
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._labels)
+
+    def intern(self, label: str) -> str:
+        """Return the shared instance of `label`, adding it to the table if it is new."""
+        if (id_ := self._ids.get(label)) is not None:
+            return self._labels[id_]
+        label = sys.intern(label)
+        self._ids[label] = len(self._labels)
+        self._labels.append(label)
+        return label
+
+    def id(self, label: str) -> int:
+        """Return the integer ID of `label`, adding it to the table if it is new."""
+        if (id_ := self._ids.get(label)) is not None:
+            return id_
+        self.intern(label)
+        return len(self._labels) - 1
+
+    def get_id(self, label: str) -> Optional[int]:
+        """Return the integer ID of `label`, or None if the table does not know it."""
+        return self._ids.get(label)
+
+    def label(self, id_: int) -> str:
+        return self._labels[id_]
+
+
+class _TreeScanner:
+    """
+    Finds the trees of bracketed text, str or bytes, by scanning parentheses
+    only, which is much cheaper than tokenizing. The depth, and where the
+    tree being scanned starts, carry over from one scan() to the next, so
+    text can be scanned as it comes in.
+    """
+
+    def __init__(self, binary: bool = False) -> None:
+        lrb, rrb = re.escape(LRB), re.escape(RRB)
+        # a parenthesis, or a whole group with none nested inside, which is
+        # most often a preterminal and needs no depth bookkeeping
+        pattern = rf"{lrb}[^{lrb}{rrb}]*{rrb}|[{lrb}{rrb}]"
+        self.paren_re: re.Pattern = re.compile(pattern.encode() if binary else pattern)
+        self.lrb: Union[str, bytes] = LRB.encode() if binary else LRB
+        self.rrb: Union[str, bytes] = RRB.encode() if binary else RRB
+        self.depth = 0
+        self.start = 0
+
+    def scan(self, buf, pos: int, end: int) -> Generator[tuple[int, int], None, None]:
+        """Yield the start and end offsets of each tree completed within buf[pos:end]."""
+        for m in self.paren_re.finditer(buf, pos, end):
+            token = m.group()
+            if token == self.lrb:
+                if self.depth == 0:
+                    self.start = m.start()
+                self.depth += 1
+            elif token == self.rrb:
+                if self.depth == 0:
+                    raise ValueError(
+                        "failed to build tree from string with extra non-matching right parentheses"
+                    )
+                self.depth -= 1
+                if self.depth == 0:
+                    yield self.start, m.end()
+            # a flat group at the top level is a tree of its own, unless it is
+            # "( )", which Tree.fromstring() skips
+            elif self.depth == 0 and token[1:-1].strip():
+                yield m.start(), m.end()
+
+
+class TreeIndex:
+    """
+    Positional index of a whole tree, built lazily by Tree.get_index() and
+    shared by all of its nodes. Lists are indexed by the preorder number of a
+    node, so the descendants of a node are a contiguous range of `nodes`:
+
+        nodes[pre]     the node itself
+        size[pre]      the number of nodes in its subtree, itself included
+        postorder[pre] its postorder number
+        left[pre]      the number of leaves preceding it
+        right[pre]     left[pre] plus the number of leaves it dominates
+        sister[pre]    its position among its parent's children, -1 for the root
+
+    and `leaves` lists the leaves from left to right, so the leaves of a node
+    are leaves[left[pre]:right[pre]] and the ordinal of a leaf is its `left`.
+    Only `nodes` and `size`, which dominance needs, are built up front; the
+    other lists are built on first access. Head annotations are computed on
+    demand and cached in `head_annotations` by head finder, see heads().
+
+    The index goes stale as soon as the tree structure changes through
+    Tree.add_child()/set_parent(), or through Tree.invalidate_index() after
+    editing `children` directly, and is then rebuilt on next use. A stale
+    index lets go of its lists, so it does not keep the old tree alive.
+    """
+
+    def __init__(self, root: "Tree") -> None:
+        nodes: list[Tree] = []
+        parents: list[int] = []
+        stack: list[tuple[Tree, int]] = [(root, -1)]
+        while stack:
+            node, parent_pre = stack.pop()
+            node._index = self
+            node._pos = len(nodes)
+            nodes.append(node)
+            parents.append(parent_pre)
+            kids = node.children
+            stack.extend((kids[i], node._pos) for i in range(len(kids) - 1, -1, -1))
+
+        size = [1] * len(nodes)
+        for pre in range(len(nodes) - 1, 0, -1):
+            size[parents[pre]] += size[pre]
+        self._set_columns(nodes, size)
+
+    @classmethod
+    def from_preorder(
+        cls, nodes: list["Tree"], size: list[int], postorder: Optional[list[int]] = None
+    ) -> "TreeIndex":
+        """
+        Index a tree from its nodes in preorder and their subtree sizes, and
+        optionally postorder numbers, when these are known already, as they
+        are for the trees of a Forest, instead of walking the tree.
+        """
+        index = cls.__new__(cls)
+        index._set_columns(nodes, size, postorder)
+        for pre, node in enumerate(nodes):
+            node._index = index
+            node._pos = pre
+        return index
+
+    def _set_columns(self, nodes: list["Tree"], size: list[int], postorder: Optional[list[int]] = None) -> None:
+        self.valid = True
+        self.head_annotations: dict[HeadFinder, tuple[list[Optional[Tree]], list[Tree]]] = {}
+        self.nodes = nodes
+        self.size = size
+        self._postorder = postorder
+        self._left: Optional[list[int]] = None
+        self._right: Optional[list[int]] = None
+        self._leaves: Optional[list[Tree]] = None
+        self._sister: Optional[list[int]] = None
+
+    def release(self) -> None:
+        """Mark the index as stale and drop its lists."""
+        self.valid = False
+        self.head_annotations = {}
+        self.nodes, self.size = [], []
+        self._postorder = self._left = self._right = self._leaves = self._sister = None
+
+    @property
+    def postorder(self) -> list[int]:
+        if self._postorder is None:
+            # parents are visited before their children
+            depth = [0] * len(self.nodes)
+            for node in self.nodes:
+                for kid in node.children:
+                    depth[kid._pos] = depth[node._pos] + 1
+            self._postorder = [pre + size - 1 - d for pre, (size, d) in enumerate(zip(self.size, depth))]
+        return self._postorder
+
+    @property
+    def left(self) -> list[int]:
+        if self._left is None:
+            self._build_leaves()
+        assert self._left is not None
+        return self._left
+
+    @property
+    def right(self) -> list[int]:
+        if self._right is None:
+            self._build_leaves()
+        assert self._right is not None
+        return self._right
+
+    @property
+    def leaves(self) -> list["Tree"]:
+        if self._leaves is None:
+            self._build_leaves()
+        assert self._leaves is not None
+        return self._leaves
+
+    def _build_leaves(self) -> None:
+        left: list[int] = []
+        leaves: list[Tree] = []
+        for node in self.nodes:
+            # ancestors are visited first, so all leaves seen so far precede the node
+            left.append(len(leaves))
+            if not node.children:
+                leaves.append(node)
+        # the leaves of a node end where those of the node following its subtree begin
+        left.append(len(leaves))
+        self._right = [left[pre + size] for pre, size in enumerate(self.size)]
+        left.pop()
+        self._left, self._leaves = left, leaves
+
+    @property
+    def sister(self) -> list[int]:
+        if self._sister is None:
+            sister = [-1] * len(self.nodes)
+            for node in self.nodes:
+                for i, kid in enumerate(node.children):
+                    # skip children added without invalidating the index
+                    if kid._index is self:
+                        sister[kid._pos] = i
+            self._sister = sister
+        return self._sister
+
+    def depth(self, node: "Tree") -> int:
+        pre = node._pos
+        return pre + self.size[pre] - 1 - self.postorder[pre]
+
+    def dominates(self, t1: "Tree", t2: "Tree") -> bool:
+        """Whether t1 properly dominates t2, in constant time."""
+        if t2._index is not self or t1._index is not self:
+            return False
+        pre1, pre2 = t1._pos, t2._pos
+        return pre1 < pre2 < pre1 + self.size[pre1]
+
+    def descendants(self, t: "Tree") -> list["Tree"]:
+        """Proper descendants of t, in preorder."""
+        pre = t._pos
+        return self.nodes[pre + 1 : pre + self.size[pre]]
+
+    def leaves_of(self, t: "Tree") -> list["Tree"]:
+        """Leaves dominated by t, or t itself if it is a leaf."""
+        pre = t._pos
+        return self.leaves[self.left[pre] : self.right[pre]]
+
+    def ith_leaf(self, t: "Tree", leaf_num: int) -> Optional["Tree"]:
+        """
+        Return the leaf_num-th leaf of t, counting from 1, or from the right
+        for negative leaf_num, or None if t has fewer leaves.
+        """
+        pre = t._pos
+        left, right = self.left[pre], self.right[pre]
+        if abs(leaf_num) > right - left:
+            return None
+        return self.leaves[left + leaf_num - 1 if leaf_num > 0 else right + leaf_num]
+
+    def heads(self, head_finder: "HeadFinder") -> tuple[list[Optional["Tree"]], list["Tree"]]:
+        """
+        Return the head child and the head terminal of every node, by
+        preorder number, as determined by head_finder. See
+        HeadFinder.annotate().
+        """
+        return head_finder.annotate(self)
+
+    def head(self, t: "Tree", head_finder: "HeadFinder") -> Optional["Tree"]:
+        """Return the head child of t, None for leaves."""
+        return self.heads(head_finder)[0][t._pos]
+
+    def heads_of(self, t1: "Tree", t2: "Tree", head_finder: "HeadFinder") -> bool:
+        """Whether t1 is on the chain of head children below t2."""
+        if t1._index is not self:
+            return False
+        end = self.heads(head_finder)[1][t2._pos]
+        # the chain is the path from t2 down to its head terminal
+        return self.dominates(t2, t1) and (t1 is end or self.dominates(t1, end))
+
+    def following(self, t: "Tree") -> list["Tree"]:
+        """Nodes whose leaves all come after those of t, in preorder."""
+        pre = t._pos
+        return self.nodes[pre + self.size[pre] :]
+
+    def preceding(self, t: "Tree") -> list["Tree"]:
+        """Nodes whose leaves all come before those of t, in preorder."""
+        left = self.left[t._pos]
+        return [node for node in self.nodes[: t._pos] if self.right[node._pos] <= left]
+
+    def has_unary_path(self, t1: "Tree", t2: "Tree") -> bool:
+        """Whether t1 dominates t2 via a chain of nodes with only one child."""
+        # every node on the chain adds one node to the subtree and one level
+        return self.dominates(t1, t2) and (
+            self.size[t1._pos] - self.size[t2._pos] == self.depth(t2) - self.depth(t1)
+        )
+
+    def has_leftmost_descendant(self, t1: "Tree", t2: "Tree") -> bool:
+        """Whether t2 is reached from t1 by following first children."""
+        # every step to a first child advances the preorder number by one
+        return self.dominates(t1, t2) and t2._pos - t1._pos == self.depth(t2) - self.depth(t1)
+
+    def has_rightmost_descendant(self, t1: "Tree", t2: "Tree") -> bool:
+        """Whether t2 is reached from t1 by following last children."""
+        # the subtrees of t1 and t2 end at the same node
+        pre1, pre2 = t1._pos, t2._pos
+        return self.dominates(t1, t2) and pre1 + self.size[pre1] == pre2 + self.size[pre2]
+
+
 class Tree:
+    # no per-instance __dict__: for the millions of nodes of a loaded treebank,
+    # the dict would take more memory than the label and the links themselves
+    __slots__ = ("label", "children", "parent", "_index", "_pos")
+
     def __init__(
         self,
         label: Optional[str] = None,
         children: Optional[list["Tree"]] = None,
         parent: Optional["Tree"] = None,
+        *,
+        labels: Optional[LabelTable] = None,
     ):
-        self.set_label(label)
+        self.set_label(label, labels)
+        # positional index, see get_index()
+        self._index: Optional[TreeIndex] = None
+        self._pos = 0
         if children is None:
             self.children = []
         else:
             for child in children:
                 child.parent = self  # type:ignore
+                child.invalidate_index()
             self.children = children
         # each subtree has at most one parent
         self.parent = parent
@@ -263,70 +578,89 @@ class Tree:
         """
         note: return 0 for the leftmost node
         """
-        i = 0
-
-        def left_edge_helper(t: "Tree", t1: "Tree") -> bool:
-            nonlocal i
-            if t is t1:
-                return True
-            elif t1.isLeaf():
-                j = len(t1.get_terminal_labels())
-                i += j
-                return False
-            else:
-                return any(left_edge_helper(t, kid) for kid in t1.children)
-
-        if left_edge_helper(self, self.getRoot()):
-            return i
-        else:
-            raise RuntimeError("Tree is not a descendant of root.")
+        return self.get_index().left[self._pos]
 
     def rightEdge(self) -> int:
         """
         note: return 1 for the leftmost node
         """
-        i = len(self.getRoot().get_terminal_labels())
-
-        def right_edge_helper(t: "Tree", t1: "Tree") -> bool:
-            nonlocal i
-            if t is t1:
-                return True
-            elif t1.isLeaf():
-                j = len(t1.get_terminal_labels())
-                i -= j
-                return False
-            else:
-                return any(right_edge_helper(t, kid) for kid in reversed(t1.children))
-
-        if right_edge_helper(self, self.getRoot()):
-            return i
-        else:
-            raise RuntimeError("Tree is not a descendant of root.")
+        return self.get_index().right[self._pos]
 
     def get_sister_index(self) -> int:
         """Return -1 for root"""
         if self.parent is None:
             return -1
+        index = self.get_index()
+        if self._index is index:
+            i = index.sister[self._pos]
+            sisters = self.parent.children
+            if i < len(sisters) and sisters[i] is self:
+                return i
+        # the node has been detached from its parent without invalidating the
+        # index, fall back to a scan
         for i, child in enumerate(self.parent.children):
             if child is self:
                 return i
         return -1
 
-    def set_label(self, label: Optional[str]) -> None:
+    def set_label(self, label: Optional[str], labels: Optional[LabelTable] = None) -> None:
+        """
+        param labels If given, the label is interned in this symbol table and
+        the node shares the table's instance of it
+        """
         if isinstance(label, str):
-            self.label: Optional[str] = self.normalize(label)
+            label = self.normalize(label)
+            self.label: Optional[str] = label if labels is None else labels.intern(label)
         elif label is None:
             self.label = None
         else:
             raise TypeError(f"label must be str, not {type(label).__name__}")
+        # heads are chosen by label, so they have to be found again; the
+        # index itself is not set yet when called from __init__()
+        if (index := getattr(self, "_index", None)) is not None:
+            index.head_annotations.clear()
 
     def set_parent(self, node: "Tree") -> None:
+        self.invalidate_index()
+        if node is not None:
+            node.invalidate_index()
         self.parent = node
 
     def add_child(self, node: "Tree") -> None:
         node.set_parent(self)
         self.children.append(node)
 
+    def get_index(self) -> TreeIndex:
+        """
+        Return the positional index of the tree this node belongs to, building
+        it on first use.
+        """
+        index = self._index
+        if index is None or not index.valid:
+            index = TreeIndex(self.getRoot())
+        return index
+
+    def invalidate_index(self) -> None:
+        """
+        Mark the positional index of this node's tree as stale. Needed only
+        after editing `children` or `parent` directly.
+        """
+        if self._index is not None:
+            self._index.release()
+            self._index = None
+
+    def drop_index(self) -> None:
+        """
+        Discard the positional index of this node's tree, and detach it from
+        all of the nodes, to free its memory once the tree is no longer
+        searched. It is rebuilt on next use.
+        """
+        if (index := self._index) is not None:
+            for node in index.nodes:
+                node._index = None
+            index.release()
+            self._index = None
+
     @classmethod
     def normalize(cls, s: str) -> str:
         return s.replace(RRB_ESCAPE, RRB).replace(LRB_ESCAPE, LRB)
@@ -336,26 +670,108 @@ class Tree:
         return s.replace(RRB, RRB_ESCAPE).replace(LRB, LRB_ESCAPE)
 
     @classmethod
-    def fromstring(cls, s: str) -> Generator["Tree", None, None]:
-        # TODO need more logging msg to indicate whether "a b c d" or "(a b c d)" is parsed correctly
-        # translated from CoreNLP's PennTreeReader
-        # https://github.com/stanfordnlp/CoreNLP/blob/main/src/edu/stanford/nlp/trees/PennTreeReader.java#L144
-
-        open_pattern = re.escape(LRB)
-        close_pattern = re.escape(RRB)
-
+    def _token_re(cls) -> re.Pattern:
         # store `token_re` to avoid repeated regex compiling
         attr = "token_re"
         if (token_re := getattr(cls, attr, None)) is None:
+            open_pattern = re.escape(LRB)
+            close_pattern = re.escape(RRB)
             token_re = re.compile(
                 rf"(?x) [{open_pattern}{close_pattern}] | [^\s{open_pattern}{close_pattern}]+"
             )
             setattr(cls, attr, token_re)
+        return token_re
+
+    @classmethod
+    def fromstring(cls, s: str, *, labels: Optional[LabelTable] = None) -> Generator["Tree", None, None]:
+        """
+        param labels Optional per-corpus symbol table, the labels of all nodes
+        built from `s` are interned in it
+        """
+        return cls._from_tokens(cls._token_re().findall(s), labels)
+
+    @classmethod
+    def iter_from_file(
+        cls, fileobj: IO[str], *, chunk_size: int = 1 << 16, labels: Optional[LabelTable] = None
+    ) -> Generator["Tree", None, None]:
+        """
+        Read trees from a text file object, `chunk_size` characters at a time,
+        and yield each tree as soon as its closing parenthesis has been read.
+        Memory use is bounded by the largest tree rather than by the file.
+
+        param labels See fromstring()
+        """
+        if chunk_size < 1:
+            raise ValueError(f"chunk_size must be positive, not {chunk_size}")
+        return cls._from_tokens(cls._tokenize_chunks(iter(partial(fileobj.read, chunk_size), "")), labels)
+
+    @classmethod
+    def iter_text_batches(
+        cls, fileobj: IO[str], batch_size: int, *, chunk_size: int = 1 << 16
+    ) -> Generator[tuple[int, str], None, None]:
+        """
+        Split the trees of a text file object into batches of up to
+        `batch_size` trees without building them, and yield the number of
+        trees and the raw text of each batch. fromstring() on the text gives
+        back the trees of the batch. Only parentheses are scanned, so this is
+        much cheaper than parsing and suits handing trees out to workers.
+        """
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be positive, not {batch_size}")
+        if chunk_size < 1:
+            raise ValueError(f"chunk_size must be positive, not {chunk_size}")
+        return cls._split_chunks(iter(partial(fileobj.read, chunk_size), ""), batch_size)
+
+    @classmethod
+    def _split_chunks(cls, chunks: Iterable[str], batch_size: int) -> Generator[tuple[int, str], None, None]:
+        scanner = _TreeScanner()
+        buf = ""
+        pos = n = 0
+        for chunk in chunks:
+            buf += chunk
+            while True:
+                # nothing after the last right parenthesis can complete a tree
+                end = buf.rfind(RRB) + 1
+                cut = None
+                for _, tree_end in scanner.scan(buf, pos, end):
+                    n += 1
+                    if n == batch_size:
+                        cut = tree_end
+                        break
+                if cut is None:
+                    pos = max(pos, end)
+                    break
+                yield n, buf[:cut]
+                buf = buf[cut:]
+                pos = n = 0
+        # left for fromstring() to raise on if the last tree is incomplete
+        if n > 0 or buf.strip():
+            yield n, buf
+
+    @classmethod
+    def _tokenize_chunks(cls, chunks: Iterable[str]) -> Generator[str, None, None]:
+        token_re = cls._token_re()
+        pending = ""
+        for chunk in chunks:
+            buf = pending + chunk
+            tokens = token_re.findall(buf)
+            # a label running up to the end of the chunk may go on in the next one
+            cut = bool(tokens) and not buf[-1].isspace() and buf[-1] not in (LRB, RRB)
+            pending = tokens.pop() if cut else ""
+            yield from tokens
+        if pending:
+            yield pending
+
+    @classmethod
+    def _from_tokens(cls, tokens: Iterable[str], labels: Optional[LabelTable]) -> Generator["Tree", None, None]:
+        # TODO need more logging msg to indicate whether "a b c d" or "(a b c d)" is parsed correctly
+        # translated from CoreNLP's PennTreeReader
+        # https://github.com/stanfordnlp/CoreNLP/blob/main/src/edu/stanford/nlp/trees/PennTreeReader.java#L144
 
         stack_parent: deque[Tree] = deque()
         current_tree = None
 
-        token_g = peekable(token_re.findall(s))
+        token_g = peekable(tokens)
         while (token := next(token_g, None)) is not None:
             if token == LRB:
                 label = None if token_g.peek() == LRB else next(token_g, None)
@@ -363,7 +779,7 @@ class Tree:
                 if label == RRB:
                     continue
 
-                new_tree = cls(label)
+                new_tree = cls(label, labels=labels)
 
                 if current_tree is None:
                     stack_parent.append(new_tree)
@@ -389,12 +805,42 @@ class Tree:
                 if current_tree is None:
                     continue
 
-                new_tree = cls(token)
+                new_tree = cls(token, labels=labels)
                 current_tree.add_child(new_tree)
 
         if current_tree is not None:
             raise ValueError("incomplete tree (extra left parentheses in input)")
 
+    @classmethod
+    def _from_preorder(
+        cls, labels: Iterable[Optional[str]], parents: Iterable[int], offset: int = 0
+    ) -> list["Tree"]:
+        """
+        Build a tree from the labels of its nodes in preorder, and the
+        positions of their parents, where parents[i] - offset is the preorder
+        number of the parent of node i, and is negative for the root, and
+        return its nodes in preorder, the root first. Labels are taken as they
+        are, already normalized, and the bookkeeping of __init__() and
+        add_child() is skipped, which roughly halves the cost of a node.
+        """
+        new = cls.__new__
+        nodes: list[Tree] = []
+        append = nodes.append
+        for label, parent_pos in zip(labels, parents):
+            node = new(cls)
+            node.label = label
+            node.children = []
+            node._index = None
+            node._pos = 0
+            if (parent_pos := parent_pos - offset) >= 0:
+                parent = nodes[parent_pos]
+                node.parent = parent
+                parent.children.append(node)
+            else:
+                node.parent = None
+            append(node)
+        return nodes
+
     @classmethod
     def _remove_extra_level(cls, root) -> "Tree":
         # get rid of extra levels of root with None label
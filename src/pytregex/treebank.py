@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+
+import mmap
+from array import array
+from collections.abc import Generator, Iterator
+from typing import Optional, Union
+
+from .tree import LRB, RRB, LabelTable, Tree, _TreeScanner
+
+_LRB = LRB.encode()
+_RRB = RRB.encode()
+# bytes that never occur inside a label, nor inside a multibyte UTF-8 character
+_SEPARATORS = (_LRB, _RRB, b" ", b"\n", b"\t", b"\r")
+
+
+class MappedTreebank:
+    """
+    A treebank file of bracketed trees, memory-mapped rather than read. The
+    file is never copied into memory as a whole: trees are tokenized from
+    the mapped pages a window at a time, so processes searching the same
+    file share its page cache. Tree boundaries are found on first need by
+    scanning parentheses only, after which tree k can be loaded directly:
+
+        starts[k]  byte offset of the opening parenthesis of tree k
+        ends[k]    byte offset just past its closing parenthesis
+    """
+
+    def __init__(self, path: str, *, labels: Optional[LabelTable] = None, window_size: int = 1 << 16) -> None:
+        """
+        param labels See Tree.fromstring()
+        param window_size Number of bytes decoded at a time while iterating
+        """
+        if window_size < 1:
+            raise ValueError(f"window_size must be positive, not {window_size}")
+        self.path = path
+        self.labels = labels
+        self.window_size = window_size
+        with open(path, "rb") as f:
+            try:
+                self._buf: Union[mmap.mmap, bytes] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # empty files cannot be mapped
+                self._buf = b""
+        self._starts: Optional[array] = None
+        self._ends: Optional[array] = None
+
+    def close(self) -> None:
+        if isinstance(self._buf, mmap.mmap):
+            self._buf.close()
+
+    def __enter__(self) -> "MappedTreebank":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def starts(self) -> array:
+        if self._starts is None:
+            self._scan()
+        assert self._starts is not None
+        return self._starts
+
+    @property
+    def ends(self) -> array:
+        if self._ends is None:
+            self._scan()
+        assert self._ends is not None
+        return self._ends
+
+    def _scan(self) -> None:
+        starts, ends = array("q"), array("q")
+        scanner = _TreeScanner(binary=True)
+        for start, end in scanner.scan(self._buf, 0, len(self._buf)):
+            starts.append(start)
+            ends.append(end)
+        if scanner.depth > 0:
+            raise ValueError("incomplete tree (extra left parentheses in input)")
+        self._starts, self._ends = starts, ends
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __getitem__(self, index: int) -> Tree:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("treebank index out of range")
+        text = self._buf[self.starts[index] : self.ends[index]].decode("utf-8")
+        return next(Tree.fromstring(text, labels=self.labels))
+
+    def __iter__(self) -> Iterator[Tree]:
+        return self.iter_range(0, len(self._buf))
+
+    def iter_range(self, start: int, end: int) -> Generator[Tree, None, None]:
+        """
+        Yield the trees in bytes `start` to `end` of the file, which should
+        be tree boundaries, such as those from batches().
+        """
+        return Tree._from_tokens(self._tokenize(start, end), self.labels)
+
+    def _tokenize(self, start: int, end: int) -> Generator[str, None, None]:
+        buf = self._buf
+        token_re = Tree._token_re()
+        pos = start
+        while pos < end:
+            stop = min(pos + self.window_size, end)
+            if stop < end:
+                # cut the window after a separator, so that no label or
+                # character is split across windows
+                cut = max(buf.rfind(sep, pos, stop) for sep in _SEPARATORS) + 1
+                if cut > pos:
+                    stop = cut
+                else:
+                    # a label longer than the window
+                    found = [i for sep in _SEPARATORS if (i := buf.find(sep, stop, end)) != -1]
+                    stop = min(found) if found else end
+            yield from token_re.findall(buf[pos:stop].decode("utf-8"))
+            pos = stop
+
+    def batches(self, batch_size: int) -> Generator[tuple[int, int, int], None, None]:
+        """
+        Group the trees into batches of up to `batch_size` trees, and yield
+        the number of the first tree of each batch, and the byte range to
+        pass to iter_range() for it.
+        """
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be positive, not {batch_size}")
+        starts, ends = self.starts, self.ends
+        for first in range(0, len(starts), batch_size):
+            last = min(first + batch_size, len(starts)) - 1
+            yield first, starts[first], ends[last]
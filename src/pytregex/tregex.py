@@ -1,8 +1,9 @@
 import logging
 import re
 import warnings
-from collections.abc import Sequence
-from typing import Union
+from collections import OrderedDict
+from collections.abc import Generator, Iterable
+from typing import NamedTuple, Optional, Union
 
 from . import relation as _r
 from .condition import (
@@ -13,6 +14,7 @@ from .condition import (
     AbstractCondition,
     And,
     BackRef,
+    Bindings,
     Condition,
     NodeDescription,
     NodeDescriptions,
@@ -21,6 +23,7 @@ from .condition import (
     Or,
 )
 from .exceptions import ParseException
+from .head_finder import HeadFinder
 from .ply import lex, yacc
 from .tree import Tree
 
@@ -122,44 +125,130 @@ class TregexPattern:
     t_ROOT = r"_ROOT_"
     t_ignore = " \r\t"
 
-    def t_error(self, t):
+    @staticmethod
+    def t_error(t):
         raise SystemExit(f'Tokenization error: Illegal character "{t.value[0]}"')
 
     literals = "!?()[]{}@&=~;"
 
-    def __init__(self, tregex_pattern: str) -> None:
-        self.lexer = lex.lex(module=self)
-        self.lexer.input(tregex_pattern)
+    # the master lexer and the LALR parser depend only on the grammar, so they
+    # are built once per process and shared by every pattern
+    _lexer: Optional[lex.Lexer] = None
+    _parser: Optional[yacc.LRParser] = None
+
+    def __init__(
+        self, tregex_pattern: str, *, head_finder: Optional[HeadFinder] = None, keep_matches: bool = True
+    ) -> None:
+        """
+        param head_finder The head finder used by the head relations (<#, >#,
+        <<#, >>#) unless another one is given when matching, None for the
+        default CollinsHeadFinder
+        param keep_matches Whether findall() keeps its matches for get_nodes()
+        """
+        self.pattern = tregex_pattern
+        self.head_finder = head_finder
+        self.keep_matches = keep_matches
 
-        # self.pattern = tregex_pattern
         # > keep track of which variables we've seen, so that we can reject
         # > some nonsense patterns such as ones that reset variables or link
         # > to variables that haven't been set
         self.backref_table: dict[str, BackRef] = {}
 
-    def findall(self, str_or_trees: Union[str, Sequence[Tree]], /) -> list[Tree]:
-        # TODO: must tupleize?
-        trees = tuple(Tree.fromstring(str_or_trees)) if isinstance(str_or_trees, str) else str_or_trees
-        parser = self.make_parser(trees)
-        # reset lexer.lexpos to make the lexer reusable
-        # https://github.com/dabeaz/ply/blob/master/doc/ply.md#internal-lexer-state
-        self.lexer.lexpos = 0
+        # per-pattern parsing state is carried by a clone of the shared lexer,
+        # grammar actions reach it through p.lexer
+        self.lexer = self.make_lexer().clone()
+        self.lexer.backref_table = self.backref_table
+        self.lexer.input(tregex_pattern)
 
-        return parser.parse(lexer=self.lexer, debug=(logging.getLogger().level == logging.DEBUG))
-        # return parser.parse(lexer=self.lexer)
+        # parse the pattern only once, findall() then just walks the resulting
+        # list of NodeDescriptions over the trees
+        parser = self.make_parser()
+        self.node_descriptions_list: list[NodeDescriptions] = parser.parse(
+            lexer=self.lexer, debug=(logging.getLogger().level == logging.DEBUG)
+        )
 
-    def get_nodes(self, name: str) -> list[Tree]:
-        try:
-            backref = self.backref_table[name]
-        except KeyError as e:
+        # matches of the last findall() call, for get_nodes()
+        self.matches: list[TregexMatch] = []
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.pattern!r})"
+
+    def finditer(
+        self, str_or_trees: Union[str, Iterable[Tree]], /, *, head_finder: Optional[HeadFinder] = None
+    ) -> Generator["TregexMatch", None, None]:
+        """
+        Lazily yield a TregexMatch for each match. Trees are parsed from the
+        string, or pulled from the iterable, one at a time, and the matches of
+        each tree are yielded before the next tree is read. Nothing is kept
+        once a match has been handed out.
+
+        param head_finder Overrides the head finder of the pattern for this call
+        """
+        from_string = isinstance(str_or_trees, str)
+        trees = Tree.fromstring(str_or_trees) if isinstance(str_or_trees, str) else str_or_trees
+        if head_finder is None:
+            head_finder = self.head_finder
+
+        for tree_index, tree in enumerate(trees):
+            for node_descriptions in self.node_descriptions_list:
+                bindings = Bindings(head_finder)
+                for node in node_descriptions.searchNodeIterator(tree, bindings):
+                    yield TregexMatch(node, tree_index, bindings.to_dict())
+            # nobody else searches trees parsed here, their index can go
+            if from_string:
+                tree.drop_index()
+
+    def findall(
+        self, str_or_trees: Union[str, Iterable[Tree]], /, *, head_finder: Optional[HeadFinder] = None
+    ) -> list[Tree]:
+        matches = self.findall_matches(str_or_trees, head_finder=head_finder)
+        if self.keep_matches:
+            self.matches = matches
+        return [m.node for m in matches]
+
+    def findall_matches(
+        self, str_or_trees: Union[str, Iterable[Tree]], /, *, head_finder: Optional[HeadFinder] = None
+    ) -> list["TregexMatch"]:
+        """
+        Return a TregexMatch for each match, without keeping any of them on
+        the pattern, which makes it safe to share between callers.
+        """
+        return list(self.finditer(str_or_trees, head_finder=head_finder))
+
+    def get_nodes(self, name: str, matches: Optional[Iterable["TregexMatch"]] = None) -> list[Tree]:
+        """
+        Return nodes named `name` by `matches`, in the order of the matches.
+
+        param matches Matches from findall_matches() or finditer(), None for
+        those of the last findall() call
+        """
+        if name not in self.backref_table:
             raise SystemExit(
                 f'Error!!  There is no matched node "{name}"!  Did you specify such a label in the pattern?'
-            ) from e
-        assert backref.nodes is not None
-        return backref.nodes
+            )
+        if matches is None:
+            if not self.keep_matches:
+                raise ValueError(
+                    f"{self!r} does not keep the matches of findall(), pass those of findall_matches()"
+                )
+            matches = self.matches
+        return [m.bindings[name] for m in matches if name in m.bindings]
+
+    @classmethod
+    def make_lexer(cls) -> lex.Lexer:
+        if cls._lexer is None:
+            cls._lexer = lex.lex(module=cls)
+        return cls._lexer
+
+    @classmethod
+    def make_parser(cls) -> yacc.LRParser:
+        if cls._parser is None:
+            cls._parser = cls._build_parser()
+        return cls._parser
 
-    def make_parser(self, trees: Sequence[Tree]):
-        tokens = self.tokens
+    @classmethod
+    def _build_parser(cls) -> yacc.LRParser:
+        tokens = cls.tokens
 
         precedence = (
             # shift on shift/reduce conflicts:
@@ -210,8 +299,6 @@ class TregexPattern:
             ("nonassoc", "=", "~"),
         )
 
-        log_indent = 0
-
         # 1. node description
         def p_ID(p):
             """
@@ -289,8 +376,8 @@ class TregexPattern:
             """
             name: str = p[3]
             node_descriptions: NodeDescriptions = p[1]
-            backref = BackRef(node_descriptions, None)
-            self.backref_table[name] = backref
+            backref = BackRef(node_descriptions)
+            p.lexer.backref_table[name] = backref
             node_descriptions.set_name(name)
 
             p[0] = node_descriptions
@@ -300,10 +387,11 @@ class TregexPattern:
             node_descriptions : '~' ID
             """
             linked_name: str = p[2]
-            if linked_name not in self.backref_table:
+            backref_table: dict[str, BackRef] = p.lexer.backref_table
+            if linked_name not in backref_table:
                 raise ParseException(f"Variable {linked_name} was referenced before it was declared")
 
-            orig_nodedescs = self.backref_table[linked_name].node_descriptions
+            orig_nodedescs = backref_table[linked_name].node_descriptions
             node_descriptions = NodeDescriptions(
                 *orig_nodedescs.descriptions,
                 under_negation=orig_nodedescs.under_negation,
@@ -331,7 +419,11 @@ class TregexPattern:
             relation_data : RELATION
             """
             symbol = p[1]
-            p[0] = _r.RelationData(self.RELATION_MAP[symbol], symbol)
+            op = cls.RELATION_MAP[symbol]
+            if op in (_r.HEADS, _r.HEADED_BY, _r.IMMEDIATELY_HEADS, _r.IMMEDIATELY_HEADED_BY):
+                p[0] = _r.HeadRelationData(op, symbol)
+            else:
+                p[0] = _r.RelationData(op, symbol)
 
         # 2.2 REL_W_STR_ARG
         def p_rel_w_str_arg_lparen_node_descriptions_rparen(p):
@@ -339,7 +431,7 @@ class TregexPattern:
             relation_data : REL_W_STR_ARG '(' node_descriptions ')'
             """
             symbol = p[1]
-            p[0] = _r.RelationWithStrArgData(self.REL_W_STR_ARG_MAP[symbol], symbol, arg=p[3])
+            p[0] = _r.RelationWithStrArgData(cls.REL_W_STR_ARG_MAP[symbol], symbol, arg=p[3])
 
         # 2.3 REL_W_NUM_ARG
         def p_relation_number(p):
@@ -351,7 +443,7 @@ class TregexPattern:
 
             if rel_key.endswith("-"):
                 num = f"-{num}"
-            p[0] = _r.RelationWithNumArgData(self.REL_W_NUM_ARG_MAP[rel_key], symbol, arg=int(num))
+            p[0] = _r.RelationWithNumArgData(cls.REL_W_NUM_ARG_MAP[rel_key], symbol, arg=int(num))
 
         def p_not_condition(p):
             """
@@ -430,7 +522,7 @@ class TregexPattern:
                 )
 
             multi_relation_data = _r.RelationWithNumArgData(rel_op, rel_key, arg=i + 1)
-            node_descriptions = NodeDescriptions(NodeDescription(NODE_ANY, self.t_BLANK))
+            node_descriptions = NodeDescriptions(NodeDescription(NODE_ANY, cls.t_BLANK))
             conditions.append(
                 Not(Condition(relation_data=multi_relation_data, node_descriptions=node_descriptions))
             )
@@ -535,21 +627,121 @@ class TregexPattern:
         #     ]
         #     p[0] = nodes
 
-        def p_node_descriptions_list(p):
-            """
-            nodes : node_descriptions_list
-            """
-            nodes = []
-            for tree in trees:
-                for node_descriptions in p[1]:
-                    nodes.extend(node_descriptions.searchNodeIterator(tree, self.backref_table))
-            p[0] = nodes
-
         def p_error(p):
             if p is None:
                 msg = "Parsing Error at EOF"
             else:
-                msg = f"{self.lexer.lexdata}\n{' ' * p.lexpos}˄\nParsing error at token '{p.value}'"
+                msg = f"{p.lexer.lexdata}\n{' ' * p.lexpos}˄\nParsing error at token '{p.value}'"
             raise ParseException(msg)
 
-        return yacc.yacc(debug=False, start="nodes")
+        return yacc.yacc(debug=False, start="node_descriptions_list")
+
+
+class TregexMatch:
+    """
+    A single match of a TregexPattern: the matched node, the index of the tree
+    it was found in, and the nodes bound to the names in the pattern.
+    """
+
+    def __init__(self, node: Tree, tree_index: int, bindings: dict[str, Tree]) -> None:
+        self.node = node
+        self.tree_index = tree_index
+        self.bindings = bindings
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(node={self.node}, tree_index={self.tree_index}, bindings={self.bindings})"
+
+    def __getitem__(self, name: str) -> Tree:
+        return self.bindings[name]
+
+    def get_node(self, name: str) -> Optional[Tree]:
+        return self.bindings.get(name)
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    maxsize: int
+    currsize: int
+
+
+class PatternCache:
+    """
+    Bounded LRU cache of compiled TregexPattern objects keyed by the pattern
+    string and head finder. A cached pattern is shared by every caller that
+    compiles the same string, so it does not keep the matches of findall():
+    get the named nodes from findall_matches() or finditer() instead.
+    """
+
+    def __init__(self, maxsize: int = 512) -> None:
+        self._patterns: OrderedDict[tuple[str, Optional[HeadFinder]], TregexPattern] = OrderedDict()
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    def __contains__(self, pattern: str) -> bool:
+        return (pattern, None) in self._patterns
+
+    @property
+    def maxsize(self) -> int:
+        return self._maxsize
+
+    @maxsize.setter
+    def maxsize(self, maxsize: int) -> None:
+        if maxsize < 0:
+            raise ValueError(f"maxsize must be non-negative, not {maxsize}")
+        self._maxsize = maxsize
+        self._evict()
+
+    def get(self, pattern: str, head_finder: Optional[HeadFinder] = None) -> TregexPattern:
+        key = (pattern, head_finder)
+        try:
+            compiled = self._patterns[key]
+        except KeyError:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._patterns.move_to_end(key)
+            return compiled
+
+        compiled = TregexPattern(pattern, head_finder=head_finder, keep_matches=False)
+        self._patterns[key] = compiled
+        self._evict()
+        return compiled
+
+    def _evict(self) -> None:
+        while len(self._patterns) > self._maxsize:
+            self._patterns.popitem(last=False)
+            self.evictions += 1
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.evictions, self._maxsize, len(self._patterns))
+
+    def purge(self) -> None:
+        """Drop all cached patterns and reset the counters."""
+        self._patterns.clear()
+        self.hits = self.misses = self.evictions = 0
+
+
+pattern_cache = PatternCache()
+
+
+def compile(pattern: str, *, cache: bool = True, head_finder: Optional[HeadFinder] = None) -> TregexPattern:
+    """
+    Compile a Tregex pattern string into a TregexPattern. With `cache=True`
+    the compiled pattern is looked up in and stored to the module-level
+    `pattern_cache`. See TregexPattern for `head_finder`.
+    """
+    if not cache:
+        return TregexPattern(pattern, head_finder=head_finder)
+    return pattern_cache.get(pattern, head_finder)
+
+
+def purge() -> None:
+    """Clear the compiled pattern cache."""
+    pattern_cache.purge()
@@ -1,8 +1,7 @@
 #!/usr/bin/env python3
 
-from typing import Optional
-
 # For all the procedures in TregexUI, return a tuple as the result The first
 # element bool indicates whether the procedure succeeds The second element is
 # the error message if it fails.
-TregexProcedureResult = tuple[bool, Optional[str]]
+# (not Optional[str], to keep typing out of the CLI startup)
+TregexProcedureResult = tuple[bool, "str | None"]
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+import pickle
+from io import BytesIO
+
+from pytregex.forest import NO_NODE, Forest
+from pytregex.tree import Tree, TreeIndex
+from pytregex.tregex import TregexPattern
+
+from .base_tmpl import BaseTmpl
+from .base_tmpl import tree as tree_string
+
+
+class TestForest(BaseTmpl):
+    def setUp(self):
+        self.tree_string = f"{tree_string}\n(A (B b) (C (D d) c))"
+        self.forest = Forest.fromstring(self.tree_string)
+        return super().setUp()
+
+    def test_trees(self):
+        trees = list(Tree.fromstring(self.tree_string))
+        self.assertEqual(len(trees), len(self.forest))
+        self.assertEqual(trees, list(self.forest))
+        self.assertEqual(trees[-1], self.forest[-1])
+        self.assertRaises(IndexError, self.forest.__getitem__, 2)
+
+        self.assertEqual(trees, list(Forest.from_trees(trees)))
+
+        # trees come with the positional index built from the forest arrays
+        tree = self.forest[1]
+        index = tree._index
+        self.assertIsNotNone(index)
+        self.assertIs(index, tree.get_index())
+        names = ("nodes", "size", "postorder", "left", "right", "leaves", "sister")
+        columns = [getattr(index, name) for name in names]
+        built = TreeIndex(tree)
+        for name, column in zip(names, columns):
+            self.assertEqual(getattr(built, name), column, name)
+
+    def test_arrays(self):
+        forest = Forest.fromstring("(A (B b) (C (D d) c))")
+        # A B b C D d c
+        self.assertEqual([NO_NODE, 0, 1, 0, 3, 4, 3], forest.parent.tolist())
+        self.assertEqual([1, 2, NO_NODE, 4, 5, NO_NODE, NO_NODE], forest.first_child.tolist())
+        self.assertEqual([NO_NODE, 3, NO_NODE, NO_NODE, 6, NO_NODE, NO_NODE], forest.next_sibling.tolist())
+        self.assertEqual([0, 1, 2, 3, 4, 5, 6], forest.preorder.tolist())
+        self.assertEqual([6, 1, 0, 5, 3, 2, 4], forest.postorder.tolist())
+        self.assertEqual([7, 2, 1, 4, 2, 1, 1], forest.size.tolist())
+        self.assertEqual(
+            ["A", "B", "b", "C", "D", "d", "c"], [forest.label(i) for i in range(forest.num_nodes)]
+        )
+
+        self.assertEqual([4, 6], list(forest.children(3)))
+        self.assertTrue(forest.is_leaf(6))
+        self.assertTrue(forest.dominates(0, 5))
+        self.assertTrue(forest.dominates(3, 5))
+        self.assertFalse(forest.dominates(1, 5))
+        self.assertFalse(forest.dominates(3, 3))
+        self.assertEqual(range(4, 7), forest.descendants(3))
+
+    def test_tree_index(self):
+        offset = self.forest.tree_offset[1]
+        self.assertEqual(0, self.forest.tree_index(offset - 1))
+        self.assertEqual(1, self.forest.tree_index(offset))
+        self.assertFalse(self.forest.dominates(0, offset))
+
+    def test_pickle(self):
+        forest = pickle.loads(pickle.dumps(self.forest))
+        self.assertEqual(list(self.forest), list(forest))
+
+    def test_dump_load(self):
+        for compress in (True, False):
+            f = BytesIO()
+            self.forest.dump(f, compress=compress)
+            f.seek(0)
+            forest = Forest.load(f)
+            f.seek(0)
+            self.assertEqual(len(self.forest), Forest.count_trees(f))
+            self.assertEqual(list(self.forest), list(forest))
+            self.assertEqual(list(self.forest.labels), list(forest.labels))
+            for name in (
+                "tree_offset",
+                "parent",
+                "first_child",
+                "next_sibling",
+                "label_id",
+                "preorder",
+                "postorder",
+                "size",
+            ):
+                self.assertEqual(getattr(self.forest, name), getattr(forest, name), name)
+
+        # materialized trees are the same as those built by Tree.fromstring()
+        tree = forest[0]
+        self.assertIs(tree, tree[0].parent)
+        self.assertIs(tree, tree[0].get_index().nodes[0])
+
+        f = BytesIO()
+        Forest().dump(f)
+        f.seek(0)
+        self.assertEqual(0, len(Forest.load(f)))
+
+        self.assertRaises(ValueError, Forest.load, BytesIO(b"(A a)"))
+        f = BytesIO()
+        self.forest.dump(f, compress=False)
+        self.assertRaises(ValueError, Forest.load, BytesIO(f.getvalue()[:-4]))
+
+    def test_findall(self):
+        pattern = TregexPattern("NP < DT")
+        self.assertEqual(pattern.findall(self.tree_string), pattern.findall(self.forest))
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+import gc
+import weakref
+
+from pytregex.abstract_collins_head_finder import HeadRule
+from pytregex.collins_head_finder import CollinsHeadFinder
+from pytregex.head_finder import HeadFinder
+from pytregex.international.pennchinese.chinese_head_finder import ChineseHeadFinder
+from pytregex.relation import default_head_finder
+from pytregex.tree import Tree
+from pytregex.tregex import TregexPattern
+
+from .base_tmpl import BaseTmpl
+
+
+class TestHeadFinder(BaseTmpl):
+    def test_head_rule(self):
+        kids = next(Tree.fromstring("(X (NN a) (JJ b) (NP c) (JJ d) (PU e))")).children
+        cases = [
+            (["left", "NP", "JJ"], 2),
+            (["right", "NP", "JJ"], 2),
+            (["right", "JJ", "NP"], 3),
+            (["left", "VP"], -1),
+            (["leftdis", "NP", "JJ"], 1),
+            (["rightdis", "NP", "JJ"], 3),
+            (["leftexcept", "NN", "JJ"], 2),
+            (["rightexcept", "PU"], 3),
+            (["left"], -1),
+        ]
+        for how, head_index in cases:
+            self.assertEqual(head_index, HeadRule(how).find(kids), how)
+
+        self.assertRaises(ValueError, HeadRule, ["up", "NP"])
+
+    def test_determine_head(self):
+        tree = next(Tree.fromstring("(NP (NP (NN apples)) (CC and) (NP (NNS pears)))"))
+        self.assertIs(tree[0], CollinsHeadFinder().determineHead(tree))
+
+        tree = next(Tree.fromstring("(ROOT (IP (NP (PN 我)) (VP (VV 走)) (PU 。)))"))
+        hf = ChineseHeadFinder()
+        self.assertIs(tree[0], hf.determineHead(tree))
+        self.assertIs(tree[0, 1], hf.determineHead(tree[0]))
+
+    def test_annotations_freed(self):
+        tree = next(Tree.fromstring("(NP (DT the) (NN dog))"))
+        self.assertEqual(["NP"], [m.node.label for m in TregexPattern("NP <# NN").finditer([tree])])
+        index = weakref.ref(tree.get_index())
+        self.assertIn(default_head_finder(), index().head_annotations)
+
+        # the finder outlives the tree, but holds nothing of it
+        del tree
+        gc.collect()
+        self.assertIsNone(index())
+
+    def test_relabel(self):
+        tree = next(Tree.fromstring("(NP (DT the) (NN dog))"))
+        pattern = TregexPattern("NP <# __=h")
+        self.assertEqual(["NN"], [m["h"].label for m in pattern.finditer([tree])])
+        # relabeling moves the head, without any structural change
+        tree[1].set_label("VB")
+        tree[0].set_label("NN")
+        self.assertEqual(["NN"], [m["h"].label for m in pattern.finditer([tree])])
+        self.assertIs(tree[0], tree.get_index().head(tree, default_head_finder()))
+
+    def test_custom_head_finder(self):
+        class First(HeadFinder):
+            def __init__(self):
+                self.calls = 0
+
+            def determineHead(self, t):
+                self.calls += 1
+                return t.children[0]
+
+        hf = First()
+        tree_string = "(NP (DT the) (NN dog))"
+        self.assertEqual([], TregexPattern("NP <# NN", head_finder=hf).findall(tree_string))
+        self.assertEqual(
+            ["NP"], [t.label for t in TregexPattern("NP <# DT", head_finder=hf).findall(tree_string)]
+        )
+        self.assertTrue(hf.calls)
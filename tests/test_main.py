@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import tempfile
+from contextlib import redirect_stdout
+from io import StringIO
+from unittest.mock import patch
+
+from pytregex.main import TregexUI, init_worker, run_task
+from pytregex.tree import Tree
+from pytregex.treebank import MappedTreebank
+
+from .base_tmpl import BaseTmpl
+
+
+class TestTregexUI(BaseTmpl):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.dir = tmpdir.name
+        self.path1 = self.write("a.txt", "(NP (DT the) (NN dog))\n(VP (VB ran))\n")
+        self.path2 = self.write("b.txt", "(S (NP (NN cat)) (VP (VB sat)))\n")
+        return super().setUp()
+
+    def write(self, name: str, s: str) -> str:
+        path = os.path.join(self.dir, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(s)
+        return path
+
+    def run_ui(self, *args: str) -> str:
+        ui = TregexUI()
+        with redirect_stdout(StringIO()) as stdout:
+            success, err_msg = ui.run_args(["pytregex", "--quiet", *args])
+        self.assertTrue(success, err_msg)
+        return stdout.getvalue()
+
+    def test_pattern(self):
+        self.assertEqual(
+            "(NP (DT the) (NN dog))\n(NP (NN cat))\n", self.run_ui("pattern", "NP", self.path1, self.path2)
+        )
+        self.assertEqual("2\n", self.run_ui("pattern", "NP", "-C", self.path1, self.path2))
+        self.assertEqual(
+            "(NN dog)\n(NN cat)\n", self.run_ui("pattern", "NP < NN=n", self.path1, self.path2, "-h", "n")
+        )
+
+    def test_prefixes(self):
+        # tree numbers count from 1 and restart with each file
+        self.assertEqual(
+            [
+                f"{self.path1}:1: (NN dog)",
+                f"{self.path1}:2: (VB ran)",
+                f"{self.path2}:1: (NN cat)",
+                f"{self.path2}:1: (VB sat)",
+            ],
+            self.run_ui("pattern", "NN|VB", "-f", "-n", self.path1, self.path2).splitlines(),
+        )
+        self.assertEqual(
+            ["2: (VB ran)", "1: (VB sat)"],
+            self.run_ui("pattern", "VB", "-n", self.path1, self.path2).splitlines(),
+        )
+        self.assertEqual(
+            [f"{self.path2}: (NN cat)"], self.run_ui("pattern", "NN", "-f", self.path2).splitlines()
+        )
+
+    def test_iter_forests(self):
+        ui = TregexUI()
+        ui.ipath_list = [self.path1, self.dir]
+        self.assertEqual((True, None), ui.verify_input(False))
+        forests = [(name, list(trees)) for name, trees in ui.iter_forests("(A a)")]
+        expected1 = list(Tree.fromstring("(NP (DT the) (NN dog)) (VP (VB ran))"))
+        expected2 = list(Tree.fromstring("(S (NP (NN cat)) (VP (VB sat)))"))
+        # directories are expanded to the *.txt files in them, in order
+        self.assertEqual([(self.path1, expected1), (self.path1, expected1), (self.path2, expected2)], forests)
+
+        ui.ipath_list = []
+        ui.verify_input(False)
+        self.assertEqual(
+            [("(default)", [Tree("A", [Tree("a")])])], [(n, list(t)) for n, t in ui.iter_forests("(A a)")]
+        )
+        ui.verify_input(True)
+        with patch("sys.stdin", StringIO("(B b)")):
+            self.assertEqual(
+                [("(standard input)", [Tree("B", [Tree("b")])])],
+                [(n, list(t)) for n, t in ui.iter_forests("(A a)")],
+            )
+
+        ui.ipath_list = [os.path.join(self.dir, "missing.txt")]
+        self.assertFalse(ui.verify_input(False)[0])
+
+    def test_jobs(self):
+        # the third file is split into batches, the others are handed out whole
+        path3 = self.write("c.txt", "".join(f"(NP (NN n{i}))\n(VP (VB v{i}))\n" for i in range(5)))
+        args = ("pattern", "NN|VB", "-f", "-n", self.path1, self.path2, path3)
+        expected = self.run_ui(*args)
+        self.assertEqual(14, len(expected.splitlines()))
+        with patch("pytregex.main.SPLIT_FILE_SIZE", 64), patch("pytregex.main.TREES_PER_TASK", 3):
+            self.assertEqual(expected, self.run_ui(*args, "-j", "2"))
+            self.assertEqual(
+                sorted(expected.splitlines()), sorted(self.run_ui(*args, "-j", "2", "--unordered").splitlines())
+            )
+            self.assertEqual(
+                "14\n", self.run_ui("pattern", "NN|VB", "-C", "-j", "2", self.path1, self.path2, path3)
+            )
+
+            ui = TregexUI()
+            ui.ipath_list = [self.path1, self.path2, path3]
+            ui.verify_input(False)
+            with MappedTreebank(path3) as treebank:
+                batches = [(path3, (start, end), first_tree) for first_tree, start, end in treebank.batches(3)]
+            self.assertEqual(4, len(batches))
+            self.assertEqual(
+                [(self.path1, None, 0), (self.path2, None, 0), *batches], list(ui.iter_tasks(2, "(A a)"))
+            )
+
+        self.assertFalse(TregexUI().run_args(["pytregex", "--quiet", "pattern", "NP", "-j", "-1"])[0])
+
+    def test_run_task(self):
+        init_worker(
+            "NN=n",
+            argparse.Namespace(handles=["n"], is_count=False, print_filename=False, print_tree_number=True),
+        )
+        self.assertEqual((1, "1: (NN dog)\n"), run_task((self.path1, None, 0)))
+        self.assertEqual((1, "6: (NN cat)\n"), run_task(("(text)", "(S (NP (NN cat)))", 5)))
+        with MappedTreebank(self.path1) as treebank:
+            ((first_tree, start, end),) = treebank.batches(2)
+        self.assertEqual((1, "1: (NN dog)\n"), run_task((self.path1, (start, end), first_tree)))
+
+    def test_compressed(self):
+        import bz2
+        import gzip
+        import lzma
+
+        with open(self.path1, "rb") as f:
+            data = f.read()
+        expected = self.run_ui("pattern", "NN|VB", "-n", self.path1)
+        for module, suffix in ((gzip, ".gz"), (bz2, ".bz2"), (lzma, ".xz")):
+            path = os.path.join(self.dir, f"a.txt{suffix}")
+            with module.open(path, "wb") as f:
+                f.write(data)
+            self.assertEqual(expected, self.run_ui("pattern", "NN|VB", "-n", path))
+            # split into batches when there are more workers than files
+            with patch("pytregex.main.TREES_PER_TASK", 1):
+                self.assertEqual(expected, self.run_ui("pattern", "NN|VB", "-n", "-j", "2", path))
+
+        # directories take compressed files along with plain ones
+        self.assertEqual(
+            [
+                *(
+                    f"{self.dir}{os.path.sep}a.txt{suffix}:{line}"
+                    for suffix in ("", ".bz2", ".gz", ".xz")
+                    for line in expected.splitlines()
+                ),
+                f"{self.path2}:1: (NN cat)",
+                f"{self.path2}:1: (VB sat)",
+            ],
+            self.run_ui("pattern", "NN|VB", "-f", "-n", self.dir).splitlines(),
+        )
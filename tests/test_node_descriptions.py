@@ -1,7 +1,19 @@
 #!/usr/bin/env python3
 
+from itertools import combinations, product
+
 import pytregex.relation as _r
-from pytregex.condition import NODE_ID, NODE_REGEX, Condition, NodeDescription, NodeDescriptions
+from pytregex.condition import (
+    NODE_ANY,
+    NODE_ID,
+    NODE_REGEX,
+    NODE_ROOT,
+    Bindings,
+    Condition,
+    NodeDescription,
+    NodeDescriptions,
+)
+from pytregex.tree import Tree
 
 from .base_tmpl import BaseTmpl
 
@@ -25,3 +37,50 @@ class TestNodeDescriptions(BaseTmpl):
         node_descs1.set_condition(cond)
 
         self.assertEqual(str(node_descs1), "(!@S|NN|/V/ < S|NN)")
+
+    def test_compiled_predicate(self):
+        # the compiled predicate agrees with checking the descriptions one by one
+        tree = next(Tree.fromstring("(S (NP-SBJ (NN dog)) (VP (VBZ barks) (ADVP (RB loudly))) (. .))"))
+        descriptions = [
+            NodeDescription(NODE_ID, "NP"),
+            NodeDescription(NODE_ID, "VBZ"),
+            NodeDescription(NODE_REGEX, "/^V/"),
+            NodeDescription(NODE_REGEX, "/^(n)P/i"),
+            NodeDescription(NODE_REGEX, "/ R B /x"),
+            NodeDescription(NODE_REGEX, "/(?i)np/"),
+            NodeDescription(NODE_ANY, "__"),
+            NodeDescription(NODE_ROOT, "_ROOT_"),
+        ]
+        for n, under_negation, use_basic_cat in product((1, 2, 3), (False, True), (False, True)):
+            for descs in combinations(descriptions, n):
+                node_descs = NodeDescriptions(
+                    *descs, under_negation=under_negation, use_basic_cat=use_basic_cat
+                )
+                for node in tree.preorder_iter():
+                    expected = any(
+                        desc.op.satisfies(
+                            node, desc.value, under_negation=under_negation, use_basic_cat=use_basic_cat
+                        )
+                        for desc in descs
+                    )
+                    self.assertEqual(expected, node_descs._satisfies_ignore_condition(node), (node_descs, node))
+
+
+class TestBindings(BaseTmpl):
+    def test_undo(self):
+        a, b, c = Tree("a"), Tree("b"), Tree("c")
+        bindings = Bindings()
+        bindings.bind("x", a)
+        mark = bindings.mark()
+        bindings.bind("x", b)
+        bindings.bind("y", c)
+        self.assertIs(b, bindings["x"])
+        self.assertIs(c, bindings["y"])
+
+        bindings.undo(mark)
+        self.assertIs(a, bindings["x"])
+        self.assertNotIn("y", bindings)
+        self.assertEqual({"x": a}, bindings.to_dict())
+
+        bindings.undo(0)
+        self.assertEqual({}, bindings.to_dict())
@@ -1,8 +1,9 @@
 #!/usr/bin/env python3
 
 import re
+from io import StringIO
 
-from pytregex.tree import Tree
+from pytregex.tree import LabelTable, Tree
 
 from .base_tmpl import BaseTmpl
 from .base_tmpl import tree as tree_string
@@ -39,6 +40,40 @@ class TestTree(BaseTmpl):
         # make sure that extra levels of root with None label has been removed
         self.assertEqual(next(Tree.fromstring(f"(({tree_string}))")), next(Tree.fromstring(tree_string)))
 
+    def test_iter_from_file(self):
+        tree_string = f"{self.tree_string}\n(NP (DT the) (NN -LRB-) (NNS dogs))\n((S (VP ran)))"
+        expected = list(Tree.fromstring(tree_string))
+        for chunk_size in (1, 2, 3, 7, 64, 1 << 16):
+            self.assertEqual(expected, list(Tree.iter_from_file(StringIO(tree_string), chunk_size=chunk_size)))
+
+        # trees are yielded as soon as they are complete
+        f = StringIO("(A (B b)) (C (D d))")
+        trees = Tree.iter_from_file(f, chunk_size=4)
+        self.assertEqual("(A (B b))", next(trees).tostring())
+        self.assertLess(f.tell(), 16)
+
+        self.assertRaises(ValueError, list, Tree.iter_from_file(StringIO("(A (B b)"), chunk_size=2))
+        self.assertRaises(ValueError, Tree.iter_from_file, StringIO("(A a)"), chunk_size=0)
+
+    def test_iter_text_batches(self):
+        tree_string = f"{self.tree_string}\n(NP (DT the) (NN -LRB-))\n( )\n((S (VP ran)))\n(A a) (B b)"
+        expected = list(Tree.fromstring(tree_string))
+        for batch_size in (1, 2, 3, 10):
+            for chunk_size in (1, 3, 64):
+                batches = list(Tree.iter_text_batches(StringIO(tree_string), batch_size, chunk_size=chunk_size))
+                self.assertTrue(all(n <= batch_size for n, _ in batches))
+                trees = [list(Tree.fromstring(text)) for _, text in batches]
+                self.assertEqual([n for n, _ in batches], [len(t) for t in trees])
+                self.assertEqual(expected, sum(trees, []))
+
+        # incomplete trees are left for fromstring() to complain about
+        ((n, text),) = Tree.iter_text_batches(StringIO("(A (B b)"), 2)
+        self.assertEqual(0, n)
+        self.assertRaises(ValueError, list, Tree.fromstring(text))
+        self.assertRaises(ValueError, Tree.iter_text_batches, StringIO("(A a)"), 0)
+        # trees are delimited as in MappedTreebank, which rejects extra right parentheses as well
+        self.assertRaises(ValueError, list, Tree.iter_text_batches(StringIO("(A a)) (B b)"), 2))
+
     def test_set_label(self):
         tree = next(Tree.fromstring(self.tree_string))
         new_label = "TOOR"  # inverse of ROOT
@@ -47,6 +82,98 @@ class TestTree(BaseTmpl):
 
         self.assertRaises(TypeError, tree.set_label, [new_label])
 
+    def test_label_table(self):
+        labels = LabelTable()
+        tree1, tree2 = Tree.fromstring("(NP (DT the) (NN dog)) (NP (DT a) (NN -LRB-))", labels=labels)
+        self.assertIs(tree1.label, tree2.label)
+        self.assertIs(tree1[1].label, tree2[1].label)
+        self.assertEqual(["NP", "DT", "the", "NN", "dog", "a", "("], list(labels))
+        self.assertEqual(0, labels.id("NP"))
+        self.assertEqual("dog", labels.label(4))
+        self.assertIsNone(labels.get_id("VP"))
+
+        tree1.set_label("VP", labels)
+        self.assertEqual(7, labels.get_id("VP"))
+        self.assertIs(labels.label(7), tree1.label)
+
+    def test_index(self):
+        tree = next(Tree.fromstring("(S (NP (NP (NN dog))) (VP (VB runs) (ADVP (RB fast))))"))
+        index = tree.get_index()
+        self.assertIs(index, tree[1, 1, 0].get_index())
+        self.assertEqual(list(tree.preorder_iter()), index.nodes)
+        self.assertEqual([10, 3, 2, 1, 0, 9, 5, 4, 8, 7, 6], index.postorder)
+        self.assertEqual([11, 4, 3, 2, 1, 6, 2, 1, 3, 2, 1], index.size)
+
+        self.assertTrue(index.dominates(tree, tree[1, 1, 0, 0]))
+        self.assertFalse(index.dominates(tree[0], tree[1, 0]))
+        self.assertFalse(index.dominates(tree[0], tree[0]))
+        self.assertEqual(list(tree[1].preorder_iter())[1:], index.descendants(tree[1]))
+
+        self.assertTrue(index.has_unary_path(tree[0], tree[0, 0, 0, 0]))
+        self.assertFalse(index.has_unary_path(tree[1], tree[1, 1, 0]))
+        self.assertTrue(index.has_leftmost_descendant(tree, tree[0, 0, 0]))
+        self.assertFalse(index.has_leftmost_descendant(tree, tree[1, 0]))
+        self.assertTrue(index.has_rightmost_descendant(tree, tree[1, 1, 0, 0]))
+        self.assertFalse(index.has_rightmost_descendant(tree, tree[1, 0]))
+
+        self.assertEqual(["dog", "runs", "fast"], [leaf.label for leaf in index.leaves])
+        self.assertEqual([0, 0, 0, 0, 0, 1, 1, 1, 2, 2, 2], index.left)
+        self.assertEqual([3, 1, 1, 1, 1, 3, 2, 2, 3, 3, 3], index.right)
+        self.assertEqual((1, 2), (tree[1, 0].leftEdge(), tree[1, 0].rightEdge()))
+        self.assertEqual(index.nodes[5:], index.following(tree[0]))
+        self.assertEqual(index.leaves[1:], index.leaves_of(tree[1]))
+        self.assertIs(tree[1, 1, 0, 0], index.ith_leaf(tree[1], 2))
+        self.assertIs(tree[1, 0, 0], index.ith_leaf(tree[1], -2))
+        self.assertIsNone(index.ith_leaf(tree[1], 3))
+        self.assertEqual(index.nodes[1:5] + index.nodes[6:8], index.preceding(tree[1, 1]))
+
+        # structural changes make the index stale
+        tree[0].add_child(Tree("PP"))
+        self.assertFalse(index.valid)
+        self.assertTrue(tree.get_index().dominates(tree[0], tree[0, 1]))
+
+        index = tree.get_index()
+        tree[1].children.pop()
+        tree[1].invalidate_index()
+        self.assertFalse(index.valid)
+        # a stale index holds on to nothing
+        self.assertIsNone(tree[1]._index)
+        self.assertEqual([], index.nodes)
+        self.assertEqual(9, tree.get_index().size[0])
+
+        # only the columns used for dominance are built up front
+        index = tree.get_index()
+        self.assertIsNone(index._left)
+        self.assertEqual(2, tree[1, 0].leftEdge())
+        self.assertIsNotNone(index._left)
+
+        tree.drop_index()
+        self.assertFalse(index.valid)
+        self.assertTrue(all(node._index is None for node in tree.preorder_iter()))
+        self.assertTrue(tree.get_index().dominates(tree, tree[1, 0]))
+
+    def test_heads(self):
+        from pytregex.collins_head_finder import CollinsHeadFinder
+
+        hf = CollinsHeadFinder()
+        index = self.tree.get_index()
+        head_child, head_terminal = index.heads(hf)
+        self.assertIs(head_child, index.heads(hf)[0])
+        for node in index.nodes:
+            self.assertIs(hf.determineHead(node), head_child[node._pos])
+            chain = []
+            head = hf.determineHead(node)
+            while head is not None:
+                chain.append(head)
+                head = hf.determineHead(head)
+            self.assertIs(chain[-1] if chain else node, head_terminal[node._pos])
+            for other in index.nodes:
+                self.assertEqual(any(other is head for head in chain), index.heads_of(other, node, hf))
+
+        # annotations are dropped along with a stale index
+        self.tree.add_child(Tree("."))
+        self.assertIsNot(head_child, self.tree.get_index().heads(hf)[0])
+
     def test_eq(self):
         from copy import deepcopy
 
@@ -108,6 +235,14 @@ class TestTree(BaseTmpl):
         tree_VP = tree_S.children.pop()
         self.assertEqual(-1, tree_VP.get_sister_index())
 
+        # positions come from the tree index and follow structural changes
+        tree_S = Tree("S", children=[Tree("NP"), Tree("VP")])
+        self.assertEqual([-1, 0, 1], tree_S.get_index().sister)
+        tree_S.children.insert(0, Tree("ADVP", parent=tree_S))
+        self.assertEqual(1, tree_S[1].get_sister_index())
+        tree_S.invalidate_index()
+        self.assertEqual(2, tree_S[2].get_sister_index())
+
     def test_isLeaf(self):
         tree = Tree()
         self.assertTrue(tree.isLeaf())
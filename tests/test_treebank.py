@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+
+from pytregex.tree import LabelTable, Tree
+from pytregex.treebank import MappedTreebank
+
+from .base_tmpl import BaseTmpl
+from .base_tmpl import tree as tree_string
+
+
+class TestMappedTreebank(BaseTmpl):
+    def setUp(self):
+        self.tree_string = f"{tree_string}\n(NP (DT 这) (NN 猫))\n( )\n((S (VP ran)))\n(A a) (B b)\n"
+        self.trees = list(Tree.fromstring(self.tree_string))
+        self.path = self.write(self.tree_string)
+        return super().setUp()
+
+    def write(self, s: str) -> str:
+        fd, path = tempfile.mkstemp(suffix=".txt")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(s)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_iter(self):
+        for window_size in (1, 2, 5, 64, 1 << 16):
+            with MappedTreebank(self.path, window_size=window_size) as treebank:
+                self.assertEqual(self.trees, list(treebank))
+
+        labels = LabelTable()
+        with MappedTreebank(self.path, labels=labels) as treebank:
+            list(treebank)
+        self.assertIn("猫", labels)
+
+        self.assertRaises(ValueError, MappedTreebank, self.path, window_size=0)
+
+    def test_random_access(self):
+        with MappedTreebank(self.path) as treebank:
+            self.assertEqual(len(self.trees), len(treebank))
+            for i, tree in enumerate(self.trees):
+                self.assertEqual(tree, treebank[i])
+            self.assertEqual(self.trees[-1], treebank[-1])
+            self.assertRaises(IndexError, treebank.__getitem__, len(self.trees))
+
+    def test_batches(self):
+        with MappedTreebank(self.path) as treebank:
+            for batch_size in (1, 2, 4):
+                trees = []
+                for first_tree, start, end in treebank.batches(batch_size):
+                    self.assertEqual(len(trees), first_tree)
+                    trees.extend(treebank.iter_range(start, end))
+                self.assertEqual(self.trees, trees)
+            self.assertRaises(ValueError, list, treebank.batches(0))
+
+    def test_malformed(self):
+        with MappedTreebank(self.write("")) as treebank:
+            self.assertEqual(0, len(treebank))
+            self.assertEqual([], list(treebank))
+
+        for s in ("(A (B b)", "(A a))"):
+            with MappedTreebank(self.write(s)) as treebank:
+                self.assertRaises(ValueError, len, treebank)
+                self.assertRaises(ValueError, list, treebank)
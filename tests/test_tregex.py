@@ -5,9 +5,11 @@
 
 from typing import Union
 
+from pytregex.collins_head_finder import CollinsHeadFinder
 from pytregex.exceptions import ParseException
+from pytregex.international.pennchinese.chinese_head_finder import ChineseHeadFinder
 from pytregex.tree import Tree
-from pytregex.tregex import TregexPattern
+from pytregex.tregex import PatternCache, TregexPattern, compile, purge
 
 from .base_tmpl import BaseTmpl
 from .base_tmpl import tree as tree_string
@@ -20,15 +22,18 @@ class TestTregex(BaseTmpl):
 
     def test_JoãoSilva(self):
         tregex1 = TregexPattern("PNT=p >>- (__=l >, (__=t <- (__=r <, __=m <- (__ <, CONJ <- __=z))))")
-        tregex2 = TregexPattern(
-            "PNT=p >>- (/(.+)/#1%var=l >, (__=t <- (__=r <, /(.+)/#1%var=m <- (__ <, CONJ <- /(.+)/#1%var=z))))"
-        )
         tregex3 = TregexPattern("PNT=p >>- (__=l >, (__=t <- (__=r <, ~l <- (__ <, CONJ <- ~l))))")
         tree_string = "(T (X (N (N Moe (PNT ,)))) (NP (X (N Curly)) (NP (CONJ and) (X (N Larry)))))"
 
         self.assertTrue(tregex1.findall(tree_string))
-        # self.assertTrue(tregex2.findall(tree_string))
-        # self.assertTrue(tregex3.findall(tree_string))
+        self.assertTrue(tregex3.findall(tree_string))
+
+        # variable groups are not supported, and patterns are parsed on construction
+        self.assertRaises(
+            SystemExit,
+            TregexPattern,
+            "PNT=p >>- (/(.+)/#1%var=l >, (__=t <- (__=r <, /(.+)/#1%var=m <- (__ <, CONJ <- /(.+)/#1%var=z))))",
+        )
 
     def test_no_results(self):
         pMWE = TregexPattern("/^MW/")
@@ -63,6 +68,121 @@ class TestTregex(BaseTmpl):
         matches = pMWE.findall("(Foo)")
         self.assertEqual(0, len(matches))
 
+    def test_parse_once(self):
+        # the pattern is parsed at construction, not on every findall()
+        self.assertRaises(ParseException, TregexPattern, "A <")
+
+        pattern = TregexPattern("foo=a $ bar")
+        self.assertEqual(2, len(pattern.findall("(a (foo 1) (bar 2)) (b (foo 3) (bar 4))")))
+        self.assertEqual(["(foo 1)", "(foo 3)"], [node.tostring() for node in pattern.get_nodes("a")])
+
+        # named nodes from the previous call are dropped
+        self.assertEqual(1, len(pattern.findall("(a (foo 5) (bar 6))")))
+        self.assertEqual(["(foo 5)"], [node.tostring() for node in pattern.get_nodes("a")])
+
+    def test_shared_parser(self):
+        pattern1 = TregexPattern("foo=a $ bar")
+        pattern2 = TregexPattern("foo=a > bar=b $ ~a")
+        self.assertIs(pattern1.make_parser(), pattern2.make_parser())
+        self.assertIsNot(pattern1.lexer, pattern2.lexer)
+        # the variables of one pattern are not visible to another
+        self.assertEqual({"a"}, set(pattern1.backref_table))
+        self.assertEqual({"a", "b"}, set(pattern2.backref_table))
+
+    def test_compile(self):
+        purge()
+        pattern = compile("/^MW/")
+        self.assertIs(pattern, compile("/^MW/"))
+        self.assertIsNot(pattern, compile("/^MW/", cache=False))
+        self.assertEqual(1, len(compile("/^MW/").findall("(ROOT (MWE (N 1) (N 2) (N 3)))")))
+
+        purge()
+        self.assertIsNot(pattern, compile("/^MW/"))
+
+        # shared patterns keep no matches, callers hold their own
+        pattern = compile("NP < NN=a")
+        self.assertEqual(1, len(pattern.findall("(NP (NN dog))")))
+        self.assertEqual([], pattern.matches)
+        self.assertRaises(ValueError, pattern.get_nodes, "a")
+        matches1 = pattern.findall_matches("(NP (NN dog))")
+        matches2 = compile("NP < NN=a").findall_matches("(NP (NN cat))")
+        self.assertEqual(["(NN dog)"], [node.tostring() for node in pattern.get_nodes("a", matches1)])
+        self.assertEqual(["(NN cat)"], [node.tostring() for node in pattern.get_nodes("a", matches2)])
+
+    def test_head_finder(self):
+        tree = "(ROOT (IP (NP (PN 我)) (VP (VV 走)) (PU 。)))"
+        collins = CollinsHeadFinder()
+        chinese = ChineseHeadFinder()
+
+        # CollinsHeadFinder has no rule for IP
+        self.assertEqual([], compile("IP <# __").findall(tree))
+        pattern = compile("IP <# __=head", head_finder=chinese)
+        self.assertIsNot(pattern, compile("IP <# __=head"))
+        self.assertIs(pattern, compile("IP <# __=head", head_finder=chinese))
+        self.assertEqual(["VP"], [m["head"].label for m in pattern.finditer(tree)])
+        self.assertEqual([], pattern.findall(tree, head_finder=collins))
+
+        # each finder keeps its own head annotations
+        trees = list(Tree.fromstring(tree))
+        compile("__ <<# __").findall(trees, head_finder=collins)
+        compile("__ <<# __").findall(trees, head_finder=chinese)
+        index = trees[0].get_index()
+        self.assertIsNone(index.head(trees[0][0], collins))
+        self.assertIs(trees[0][0, 1], index.head(trees[0][0], chinese))
+
+    def test_pattern_cache(self):
+        cache = PatternCache(maxsize=2)
+        a = cache.get("A")
+        cache.get("B")
+        self.assertIs(a, cache.get("A"))
+        # "B" is the least recently used one
+        cache.get("C")
+        self.assertIn("A", cache)
+        self.assertNotIn("B", cache)
+        self.assertEqual((1, 3, 1, 2, 2), tuple(cache.info()))
+
+        cache.maxsize = 1
+        self.assertNotIn("A", cache)
+        self.assertEqual(1, len(cache))
+        self.assertEqual(2, cache.info().evictions)
+
+        cache.purge()
+        self.assertEqual((0, 0, 0, 1, 0), tuple(cache.info()))
+
+        self.assertRaises(ValueError, PatternCache, maxsize=-1)
+
+    def test_finditer(self):
+        pattern = TregexPattern("/^MW/")
+        it = pattern.finditer("(ROOT (MWE (N 1) (N 2))) (ROOT (MWV (A B))) (ROOT (MWX")
+        # matches are yielded before the rest of the input is read
+        self.assertEqual("(MWE (N 1) (N 2))", next(it).node.tostring())
+        self.assertEqual("(MWV (A B))", next(it).node.tostring())
+        self.assertRaises(ValueError, next, it)
+
+        trees = Tree.fromstring("(ROOT (MWE (N 1) (N 2)) (MWV (A B)))")
+        self.assertEqual(
+            ["(MWE (N 1) (N 2))", "(MWV (A B))"], [match.node.tostring() for match in pattern.finditer(trees)]
+        )
+
+    def test_match_bindings(self):
+        pattern = TregexPattern("A ?[< B=foo || < C=bar]")
+        matches = list(pattern.finditer("(A (B 1) (C 2) (B 3)) (X (A (C 4)))"))
+        self.assertEqual([0, 0, 0, 1], [m.tree_index for m in matches])
+        self.assertEqual(
+            [{"foo": "(B 1)"}, {"foo": "(B 3)"}, {"bar": "(C 2)"}, {"bar": "(C 4)"}],
+            [{name: node.tostring() for name, node in m.bindings.items()} for m in matches],
+        )
+        self.assertEqual("(B 1)", matches[0]["foo"].tostring())
+        self.assertIsNone(matches[0].get_node("bar"))
+
+        # each match carries the nodes it was matched with
+        pattern = TregexPattern("A < B=b < C=c")
+        matches = list(pattern.finditer("(A (B 1) (B 2) (C 3) (C 4))"))
+        self.assertEqual(
+            [("(B 1)", "(C 3)"), ("(B 1)", "(C 4)"), ("(B 2)", "(C 3)"), ("(B 2)", "(C 4)")],
+            [(m["b"].tostring(), m["c"].tostring()) for m in matches],
+        )
+
     def test_ith_child(self):
         # A is the ith child of B
         self.run_test(
@@ -977,27 +1097,23 @@ class TestTregex(BaseTmpl):
 
     def test_nonsense(self):
         # can't name a variable twice
-        pattern = TregexPattern("foo=a $ bar=a")
-        self.assertRaises(ParseException, pattern.findall, "(A)")
+        self.assertRaises(ParseException, TregexPattern, "foo=a $ bar=a")
 
         # another way of doing the same thing
-        pattern = TregexPattern("foo=a > bar=b $ ~a=b")
-        self.assertRaises(ParseException, pattern.findall, "(A)")
+        self.assertRaises(ParseException, TregexPattern, "foo=a > bar=b $ ~a=b")
 
         # ... but this should work
         TregexPattern("foo=a > bar=b $ ~a").findall("(A)")
 
         # can't link to a variable that doesn't exist yet
-        pattern = TregexPattern("~a $- (bar=a $- foo)")
-        self.assertRaises(ParseException, pattern.findall, "(A)")
+        self.assertRaises(ParseException, TregexPattern, "~a $- (bar=a $- foo)")
 
         # can't reference a variable that doesn't exist yet
         # pattern = TregexPattern("=a $- (bar=a $- foo)")
         # self.assertRaises(ParseException, pattern.findall, '(A)')
 
         # you'd have to be really demented to do this
-        pattern = TregexPattern("~a=a $- (bar=b $- foo)")
-        self.assertRaises(ParseException, pattern.findall, "(A)")
+        self.assertRaises(ParseException, TregexPattern, "~a=a $- (bar=b $- foo)")
 
         # This should work... no reason this would barf
         TregexPattern("foo=a : ~a").findall("(A)")
@@ -1018,8 +1134,7 @@ class TestTregex(BaseTmpl):
         #   # yay, passed
 
         # can't name a variable under a negation
-        pattern = TregexPattern("__ ! > __=a")
-        self.assertRaises(ParseException, pattern.findall, "(A)")
+        self.assertRaises(ParseException, TregexPattern, "__ ! > __=a")
 
         self.assertRaises(ParseException, self.run_test, "A=a < B=a < C=a", "")
         self.assertRaises(ParseException, self.run_test, "A=a < B=a", "")
@@ -1029,8 +1144,7 @@ class TestTregex(BaseTmpl):
 
     def test_numbered_sister(self):
         # this shouldn't mean anything
-        pattern = TregexPattern("A $5 B")
-        self.assertRaises(KeyError, pattern.findall, "(A)")
+        self.assertRaises(KeyError, TregexPattern, "A $5 B")
 
         # this should be fine
         TregexPattern("A <5 B").findall("(A)")